@@ -0,0 +1,91 @@
+"""Преобразование строк values() в словари ответа API.
+
+Запросы API выбирают только нужные столбцы через values(), поэтому
+объекты Post, User и Group не создаются, а строка сразу превращается
+в словарь для JSON.
+
+Число комментариев есть только у отдельного поста: валидаторы лент
+(posts.conditional) не меняются при новых комментариях, и в списке
+оно устаревало бы до следующего поста.
+"""
+from django.core.files.storage import default_storage
+
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'image', 'image_width', 'image_height',
+    'author_id', 'author__username', 'author__first_name',
+    'author__last_name',
+    'group_id', 'group__slug', 'group__title',
+)
+
+POST_DETAIL_FIELDS = POST_FIELDS + ('comment_count',)
+
+COMMENT_FIELDS = (
+    'id', 'text', 'created',
+    'author_id', 'author__username', 'author__first_name',
+    'author__last_name',
+)
+
+USER_FIELDS = (
+    'id', 'username', 'first_name', 'last_name',
+    'stats__posts_count', 'stats__followers_count',
+    'stats__following_count',
+)
+
+GROUP_FIELDS = ('id', 'slug', 'title', 'description')
+
+
+def _author(row: dict) -> dict:
+    full_name = f'{row["author__first_name"]} {row["author__last_name"]}'
+    return {
+        'id': row['author_id'],
+        'username': row['author__username'],
+        'full_name': full_name.strip(),
+    }
+
+
+def post(row: dict) -> dict:
+    image = row['image']
+    data = {
+        'id': row['id'],
+        'text': row['text'],
+        'pub_date': row['pub_date'].isoformat(),
+        'image': {
+            'url': default_storage.url(image),
+            'width': row['image_width'],
+            'height': row['image_height'],
+        } if image else None,
+        'author': _author(row),
+        'group': {
+            'id': row['group_id'],
+            'slug': row['group__slug'],
+            'title': row['group__title'],
+        } if row['group_id'] else None,
+    }
+    if 'comment_count' in row:
+        data['comment_count'] = row['comment_count']
+    return data
+
+
+def comment(row: dict) -> dict:
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'created': row['created'].isoformat(),
+        'author': _author(row),
+    }
+
+
+def user(row: dict) -> dict:
+    full_name = f'{row["first_name"]} {row["last_name"]}'
+    return {
+        'id': row['id'],
+        'username': row['username'],
+        'full_name': full_name.strip(),
+        'posts_count': row['stats__posts_count'],
+        'followers_count': row['stats__followers_count'],
+        'following_count': row['stats__following_count'],
+    }
+
+
+def group(row: dict) -> dict:
+    return dict(row)
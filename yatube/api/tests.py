@@ -0,0 +1,129 @@
+import json
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from posts.models import Comment, Follow, Group, Post, User
+
+
+def read_json(response):
+    return json.loads(b''.join(response.streaming_content))
+
+
+class ApiTest(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.posts = [
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост {i}')
+            for i in range(3)
+        ]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_post_fields(self):
+        response = self.guest_client.get(reverse('api:index'))
+        self.assertEqual(response['Content-Type'], 'application/json')
+        first = read_json(response)['results'][0]
+        self.assertEqual(first, {
+            'id': self.post.id,
+            'text': self.post.text,
+            'pub_date': self.post.pub_date.isoformat(),
+            'image': None,
+            'author': {'id': self.author.id, 'username': 'author',
+                       'full_name': 'Лев Толстой'},
+            'group': {'id': self.group.id, 'slug': 'group',
+                      'title': 'Группа'},
+        })
+
+    @override_settings(PAGE=2)
+    def test_cursor_pagination(self):
+        url = reverse('api:group_list', kwargs={'slug': 'group'})
+        data = read_json(self.guest_client.get(url))
+        self.assertEqual(data['group']['description'], 'Описание')
+        self.assertEqual(len(data['results']), 2)
+        self.assertIsNone(data['previous'])
+        data = read_json(
+            self.guest_client.get(url, {'after': data['next']}))
+        self.assertEqual([post['id'] for post in data['results']],
+                         [self.posts[0].id])
+        self.assertIsNone(data['next'])
+        self.assertIsNotNone(data['previous'])
+
+    def test_profile(self):
+        url = reverse('api:profile', kwargs={'username': 'author'})
+        author = read_json(self.guest_client.get(url))['author']
+        self.assertEqual(author['posts_count'], 3)
+        self.assertEqual(author['followers_count'], 1)
+        self.assertNotIn('following', author)
+        author = read_json(self.authorized_client.get(url))['author']
+        self.assertTrue(author['following'])
+
+    def test_follow_index(self):
+        url = reverse('api:follow_index')
+        response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        data = read_json(self.authorized_client.get(url))
+        self.assertEqual(len(data['results']), 3)
+
+    def test_post_detail(self):
+        url = reverse('api:post_detail', kwargs={'post_id': self.post.id})
+        data = read_json(self.guest_client.get(url))
+        self.assertEqual(data['post']['id'], self.post.id)
+        self.assertEqual(data['post']['comment_count'], 1)
+        self.assertEqual(data['results'][0]['text'], 'Комментарий')
+        self.assertEqual(data['results'][0]['author']['username'], 'reader')
+
+    def test_not_found(self):
+        urls = [
+            reverse('api:group_list', kwargs={'slug': 'missing'}),
+            reverse('api:profile', kwargs={'username': 'missing'}),
+            reverse('api:post_detail', kwargs={'post_id': 0}),
+            reverse('api:comments', kwargs={'post_id': 0}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                self.assertEqual(response['Content-Type'],
+                                 'application/json')
+
+    def test_not_modified(self):
+        url = reverse('api:post_detail', kwargs={'post_id': self.post.id})
+        etag = self.guest_client.get(url)['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Ещё один')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_query_budget(self):
+        """Страница API читается одним запросом на каждую выборку."""
+        budgets = {
+            reverse('api:index'): 1,
+            reverse('api:group_list', kwargs={'slug': 'group'}): 3,
+            reverse('api:profile', kwargs={'username': 'author'}): 3,
+            reverse('api:post_detail', kwargs={'post_id': self.post.id}): 3,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                self.assertQueryBudget(self.guest_client, url, budget)
@@ -0,0 +1,164 @@
+"""JSON API лент и постов для мобильных и партнёрских клиентов.
+
+Ответы собираются из строк values() без создания моделей и рендеринга
+шаблонов, отдаются по частям (StreamingHttpResponse) в компактном JSON
+и поддерживают условный GET с теми же версиями, что и HTML-страницы.
+Списки листаются курсором: в ответе есть next и previous, которые
+передаются обратно параметрами ?after= и ?before=.
+"""
+import functools
+import json
+from http import HTTPStatus
+
+from django.conf import settings
+from django.http import (HttpRequest, HttpResponse, JsonResponse,
+                         StreamingHttpResponse)
+
+from posts import conditional, counters, feed
+from posts.models import Comment, Group, Post, User
+from posts.paginators import CursorPage, CursorPaginator, decode_cursor
+
+from . import serializers
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def _error(status: HTTPStatus, detail: str) -> JsonResponse:
+    return JsonResponse({'detail': detail}, status=status,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def _not_found() -> JsonResponse:
+    return _error(HTTPStatus.NOT_FOUND, 'Не найдено.')
+
+
+def _login_required(view):
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _error(HTTPStatus.UNAUTHORIZED, 'Требуется авторизация.')
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _page(request: HttpRequest, queryset, per_page: int = None,
+          **cursor_options) -> CursorPage:
+    paginator = CursorPaginator(queryset, per_page or settings.PAGE,
+                                **cursor_options)
+    return paginator.get_cursor_page(
+        after=decode_cursor(request.GET.get('after', '')),
+        before=decode_cursor(request.GET.get('before', '')),
+    )
+
+
+def _stream(page: CursorPage, serialize, **extra) -> StreamingHttpResponse:
+    """Отдаёт {**extra, "results": [...], "next", "previous"} по частям."""
+    def chunks():
+        head = ''.join(f'{_dumps(key)}:{_dumps(value)},'
+                       for key, value in extra.items())
+        yield f'{{{head}"results":['.encode()
+        for index, row in enumerate(page.object_list):
+            separator = ',' if index else ''
+            yield (separator + _dumps(serialize(row))).encode()
+        cursors = _dumps({
+            'next': page.next_cursor or None,
+            'previous': page.previous_cursor or None,
+        })
+        yield f'],{cursors[1:]}'.encode()
+    return StreamingHttpResponse(chunks(), content_type='application/json')
+
+
+def _posts_page(request: HttpRequest, posts, **extra) -> HttpResponse:
+    page = _page(request, posts.values(*serializers.POST_FIELDS))
+    return _stream(page, serializers.post, **extra)
+
+
+@conditional.page(conditional.index_keys)
+def index(request: HttpRequest) -> HttpResponse:
+    """Лента последних постов.
+    """
+    return _posts_page(request, Post.objects.all())
+
+
+@conditional.page(conditional.group_keys)
+def group_posts(request: HttpRequest, slug: str) -> HttpResponse:
+    """Сообщество и его посты.
+    """
+    group = Group.objects.filter(slug=slug).values(
+        *serializers.GROUP_FIELDS
+    ).first()
+    if group is None:
+        return _not_found()
+    return _posts_page(
+        request, Post.objects.filter(group_id=group['id']),
+        group=serializers.group(group),
+    )
+
+
+@conditional.page(conditional.profile_keys)
+def profile(request: HttpRequest, username: str) -> HttpResponse:
+    """Пользователь со счётчиками и его посты.
+    """
+    author = User.objects.filter(username=username).values(
+        *serializers.USER_FIELDS
+    ).first()
+    if author is None:
+        return _not_found()
+    if author['stats__posts_count'] is None:
+        stats = counters.reconcile_user(author['id'])
+        author.update(
+            stats__posts_count=stats.posts_count,
+            stats__followers_count=stats.followers_count,
+            stats__following_count=stats.following_count,
+        )
+    author = serializers.user(author)
+    if request.user.is_authenticated:
+        author['following'] = request.user.follower.filter(
+            author_id=author['id']
+        ).exists()
+    return _posts_page(
+        request, Post.objects.filter(author_id=author['id']), author=author
+    )
+
+
+@_login_required
+@conditional.page(conditional.follow_keys)
+def follow_index(request: HttpRequest) -> HttpResponse:
+    """Лента подписок текущего пользователя.
+    """
+    posts = feed.posts_for(request.user).values(*serializers.POST_FIELDS)
+    page = _page(request, posts, lookups=('feed_date', 'feed_post'))
+    return _stream(page, serializers.post)
+
+
+def _comments_page(request: HttpRequest, post_id: int,
+                   **extra) -> HttpResponse:
+    comments = Comment.objects.filter(post_id=post_id).values(
+        *serializers.COMMENT_FIELDS
+    )
+    page = _page(request, comments, settings.COMMENTS_PAGE,
+                 keys=('created', 'id'))
+    return _stream(page, serializers.comment, **extra)
+
+
+@conditional.page(conditional.detail_keys)
+def post_detail(request: HttpRequest, post_id: int) -> HttpResponse:
+    """Пост и первая страница комментариев к нему.
+    """
+    post = Post.objects.filter(id=post_id).values(
+        *serializers.POST_DETAIL_FIELDS
+    ).first()
+    if post is None:
+        return _not_found()
+    return _comments_page(request, post_id, post=serializers.post(post))
+
+
+@conditional.page(conditional.comments_keys)
+def post_comments(request: HttpRequest, post_id: int) -> HttpResponse:
+    """Следующие страницы комментариев поста.
+    """
+    if not Post.objects.filter(id=post_id).exists():
+        return _not_found()
+    return _comments_page(request, post_id)
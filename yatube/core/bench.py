@@ -0,0 +1,230 @@
+"""Нагрузочный замер страниц на синтетических данных.
+
+Модуль наполняет базу пользователями, группами, постами, комментариями
+и подписками, после чего прогоняет каждый маршрут из пространств имён
+posts, users и about через тестовый клиент и собирает задержки, число
+SQL-запросов и размер ответа. Используется командой ``manage.py bench``.
+"""
+import math
+import random
+import time
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+from mixer.backend.django import mixer
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+NAMESPACES = ('posts', 'users', 'about', 'api')
+
+# Маршруты, которые имеет смысл замерять POST-запросом.
+POST_DATA = {
+    'posts:add_comment': {'text': 'Комментарий для замера'},
+}
+
+# Маршруты, доступные только автору поста.
+AUTHOR_ROUTES = ('posts:post_edit',)
+
+# Маршруты, которые гостю отвечают 401, а не перенаправлением на вход.
+LOGIN_ROUTES = ('api:follow_index',)
+
+
+def seed(users=50, groups=5, posts=500, comments=1000, follows=200,
+         seed_value=0) -> dict:
+    """Наполняет базу синтетическими данными через mixer и Faker.
+
+    Записи создаются обычным сохранением, поэтому срабатывают сигналы:
+    счётчики и ленты подписок заполняются так же, как на сайте.
+    """
+    random.seed(seed_value)
+    mixer.faker.seed_instance(seed_value)
+    authors = mixer.cycle(users).blend(
+        User, username=mixer.sequence('bench{0}')
+    )
+    group_list = [None]
+    if groups:
+        group_list = mixer.cycle(groups).blend(
+            Group, slug=mixer.sequence('bench-{0}')
+        )
+    post_list = mixer.cycle(posts).blend(
+        Post,
+        author=(random.choice(authors) for _ in range(posts)),
+        group=(random.choice(group_list) for _ in range(posts)),
+        image='',
+        text=mixer.faker.text,
+    )
+    mixer.cycle(comments).blend(
+        Comment,
+        post=(random.choice(post_list) for _ in range(comments)),
+        author=(random.choice(authors) for _ in range(comments)),
+        text=mixer.faker.sentence,
+    )
+    user_ids = list(User.objects.values_list('id', flat=True))
+    pairs = set()
+    limit = len(user_ids) * (len(user_ids) - 1)
+    while len(pairs) < min(follows, limit):
+        user_id, author_id = random.sample(user_ids, 2)
+        pairs.add((user_id, author_id))
+    for user_id, author_id in sorted(pairs):
+        Follow.objects.create(user_id=user_id, author_id=author_id)
+    return {
+        'users': len(user_ids),
+        'groups': groups,
+        'posts': posts,
+        'comments': comments,
+        'follows': len(pairs),
+    }
+
+
+def sample_objects() -> dict:
+    """Выбирает самые «тяжёлые» объекты для подстановки в URL."""
+    author = User.objects.annotate(
+        num_posts=Count('posts')
+    ).order_by('-num_posts', 'id').first()
+    reader = User.objects.exclude(id=author.id).annotate(
+        num_following=Count('follower')
+    ).order_by('-num_following', 'id').first()
+    group = Group.objects.annotate(
+        num_posts=Count('posts')
+    ).order_by('-num_posts', 'id').first()
+    post = Post.objects.annotate(
+        num_comments=Count('comments')
+    ).order_by('-num_comments', 'id').first()
+    return {
+        'reader': reader,
+        'author': post.author,
+        'query': {'posts:search': {'q': post.text.split()[0]}},
+        'kwargs': {
+            'username': author.username,
+            'slug': group.slug if group else 'missing',
+            'post_id': post.id,
+        },
+    }
+
+
+def discover_routes(namespaces=NAMESPACES) -> list:
+    """Возвращает имена маршрутов вида 'posts:index' и их параметры."""
+    routes = []
+    for resolver in get_resolver().url_patterns:
+        if not isinstance(resolver, URLResolver):
+            continue
+        if resolver.namespace not in namespaces:
+            continue
+        for pattern in resolver.url_patterns:
+            if not pattern.name:
+                continue
+            name = f'{resolver.namespace}:{pattern.name}'
+            params = list(getattr(pattern.pattern, 'converters', {}))
+            if (name, params) not in routes:
+                routes.append((name, params))
+    return routes
+
+
+def percentile(samples, percent: float) -> float:
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(samples)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def _content_length(response) -> int:
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def measure(client, url: str, data=None, repeat: int = 20, warmup: int = 1,
+            login=None) -> dict:
+    """Замеряет страницу repeat раз после warmup прогревочных запросов."""
+    timings = []
+    queries = []
+    sizes = []
+    status = None
+    for iteration in range(warmup + repeat):
+        if login is not None and '_auth_user_id' not in client.session:
+            client.force_login(login)
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            if data is None:
+                response = client.get(url)
+            else:
+                response = client.post(url, data)
+            size = _content_length(response)
+            elapsed = time.perf_counter() - started
+        if iteration < warmup:
+            continue
+        timings.append(elapsed * 1000)
+        queries.append(len(captured))
+        sizes.append(size)
+        status = response.status_code
+    return {
+        'status': status,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'queries': max(queries),
+        'bytes': max(sizes),
+    }
+
+
+def run(repeat: int = 20, warmup: int = 1, namespaces=NAMESPACES) -> list:
+    """Прогоняет все маршруты гостем и авторизованным пользователем."""
+    objects = sample_objects()
+    guest, reader, author = Client(), Client(), Client()
+    results = []
+    for name, params in discover_routes(namespaces):
+        url = reverse(name, kwargs={
+            param: objects['kwargs'][param] for param in params
+        })
+        if name in objects['query']:
+            url += '?' + urlencode(objects['query'][name])
+        clients = {
+            'guest': (guest, None),
+            'auth': (reader, objects['reader']),
+        }
+        if name in AUTHOR_ROUTES:
+            clients['auth'] = (author, objects['author'])
+        if name in LOGIN_ROUTES:
+            del clients['guest']
+        for client_name, (client, login) in clients.items():
+            result = measure(client, url, POST_DATA.get(name),
+                             repeat, warmup, login)
+            results.append({
+                'route': name,
+                'url': url,
+                'client': client_name,
+                **result,
+            })
+    return results
+
+
+def compare(previous: list, current: list, tolerance: float = 0.2) -> list:
+    """Возвращает описания регрессий относительно прошлого прогона.
+
+    Регрессией считается рост p95 больше чем на tolerance или любой рост
+    числа запросов для того же маршрута и клиента.
+    """
+    before = {(item['route'], item['client']): item for item in previous}
+    regressions = []
+    for item in current:
+        old = before.get((item['route'], item['client']))
+        if old is None:
+            continue
+        label = f"{item['route']} ({item['client']})"
+        if item['queries'] > old['queries']:
+            regressions.append(
+                f"{label}: запросов {old['queries']} -> {item['queries']}"
+            )
+        if item['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+            regressions.append(
+                f"{label}: p95 {old['p95_ms']} -> {item['p95_ms']} мс"
+            )
+    return regressions
@@ -0,0 +1,289 @@
+"""Кэш в файле SQLite, общий для всех рабочих процессов на сервере.
+
+LocMemCache держит отдельную копию данных в каждом процессе gunicorn, а
+этому бэкенду достаточно общего файла: процессы читают и пишут одну базу
+в режиме WAL. Объём данных ограничен MAX_BYTES, при превышении удаляются
+давно не читавшиеся записи (LRU). Время последнего чтения обновляется не
+чаще раза в ACCESS_RESOLUTION секунд, чтобы чтения не превращались в
+запись на каждый запрос.
+
+Пример настройки::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': '/var/cache/yatube/cache.sqlite3',
+            'OPTIONS': {'MAX_BYTES': 64 * 1024 * 1024},
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+CREATE TABLE IF NOT EXISTS cache_size (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    total INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_size (id, total) VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_size_ai AFTER INSERT ON cache BEGIN
+    UPDATE cache_size SET total = total + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_size_ad AFTER DELETE ON cache BEGIN
+    UPDATE cache_size SET total = total - old.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_size_au AFTER UPDATE OF size ON cache
+BEGIN
+    UPDATE cache_size SET total = total + new.size - old.size;
+END;
+'''
+
+UPSERT = '''
+INSERT INTO cache (key, value, expires, accessed, size)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    value = excluded.value,
+    expires = excluded.expires,
+    accessed = excluded.accessed,
+    size = excluded.size
+'''
+
+# Удаляет самые старые по чтению записи, пока не освободится ? байт.
+EVICT = '''
+DELETE FROM cache WHERE key IN (
+    SELECT key FROM (
+        SELECT key, size,
+               SUM(size) OVER (ORDER BY accessed, key) AS running
+        FROM cache
+    ) WHERE running - size < ?
+)
+'''
+
+# Ограничение SQLite на число параметров запроса.
+CHUNK_SIZE = 500
+
+
+class SQLiteCache(BaseCache):
+    """Бэкенд кэша Django поверх файла SQLite."""
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.location = location
+        self.max_bytes = int(options.get('MAX_BYTES', 64 * 1024 * 1024))
+        self.cull_ratio = float(options.get('CULL_RATIO', 0.9))
+        self.access_resolution = float(options.get('ACCESS_RESOLUTION', 1.0))
+        self.busy_timeout = float(options.get('BUSY_TIMEOUT', 5.0))
+        self._local = threading.local()
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        """Соединение текущего потока; после fork открывается заново."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        directory = os.path.dirname(self.location)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(
+            self.location, timeout=self.busy_timeout,
+            isolation_level=None, check_same_thread=False,
+        )
+        connection.execute('PRAGMA journal_mode = WAL')
+        connection.execute('PRAGMA synchronous = NORMAL')
+        connection.executescript(SCHEMA)
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def _transaction(self):
+        """Транзакция с блокировкой записи сразу, для атомарных операций."""
+        return _Transaction(self._connection)
+
+    def _encode(self, value) -> bytes:
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _row(self, key: str, value, timeout, now: float) -> tuple:
+        blob = self._encode(value)
+        expires = self.get_backend_timeout(timeout)
+        return key, blob, expires, now, len(key) + len(blob)
+
+    def _cull(self, connection: sqlite3.Connection, now: float) -> None:
+        total, = connection.execute(
+            'SELECT total FROM cache_size WHERE id = 0'
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        connection.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        total, = connection.execute(
+            'SELECT total FROM cache_size WHERE id = 0'
+        ).fetchone()
+        excess = total - int(self.max_bytes * self.cull_ratio)
+        if excess > 0:
+            connection.execute(EVICT, (excess,))
+
+    def _fetch(self, keys: list, now: float) -> dict:
+        """Читает живые записи и отмечает время обращения к ним."""
+        connection = self._connection
+        found, stale, expired = {}, [], []
+        for start in range(0, len(keys), CHUNK_SIZE):
+            chunk = keys[start:start + CHUNK_SIZE]
+            placeholders = ', '.join('?' * len(chunk))
+            rows = connection.execute(
+                'SELECT key, value, expires, accessed FROM cache '
+                f'WHERE key IN ({placeholders})', chunk
+            )
+            for key, blob, expires, accessed in rows:
+                if expires is not None and expires <= now:
+                    expired.append((key, expires))
+                    continue
+                found[key] = pickle.loads(blob)
+                if now - accessed >= self.access_resolution:
+                    stale.append((now, key))
+        if expired:
+            connection.executemany(
+                'DELETE FROM cache WHERE key = ? AND expires = ?', expired
+            )
+        if stale:
+            connection.executemany(
+                'UPDATE cache SET accessed = ? WHERE key = ?', stale
+            )
+        return found
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        found = self._fetch([key], time.time())
+        return found.get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys_map = {}
+        for key in keys:
+            cache_key = self.make_key(key, version=version)
+            self.validate_key(cache_key)
+            keys_map[cache_key] = key
+        found = self._fetch(list(keys_map), time.time())
+        return {keys_map[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        rows = []
+        for key, value in data.items():
+            cache_key = self.make_key(key, version=version)
+            self.validate_key(cache_key)
+            rows.append(self._row(cache_key, value, timeout, now))
+        with self._transaction() as connection:
+            connection.executemany(UPSERT, rows)
+            self._cull(connection, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None and (row[0] is None or row[0] > now):
+                return False
+            connection.execute(UPSERT, self._row(key, value, timeout, now))
+            self._cull(connection, now)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            blob = self._encode(value)
+            connection.execute(
+                'UPDATE cache SET value = ?, size = ?, accessed = ? '
+                'WHERE key = ?', (blob, len(key) + len(blob), now, key)
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        with self._transaction() as connection:
+            updated = connection.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, now)
+            ).rowcount
+        return bool(updated)
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._connection.execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        cache_keys = []
+        for key in keys:
+            cache_key = self.make_key(key, version=version)
+            self.validate_key(cache_key)
+            cache_keys.append((cache_key,))
+        with self._transaction() as connection:
+            connection.executemany('DELETE FROM cache WHERE key = ?',
+                                   cache_keys)
+
+    def clear(self):
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединения живут всё время работы потока: открывать файл и
+        # проверять схему на каждый запрос дороже, чем держать их открытыми.
+        pass
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT с откатом при исключении."""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.connection.execute('COMMIT')
+        else:
+            self.connection.execute('ROLLBACK')
+        return False
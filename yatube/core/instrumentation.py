@@ -0,0 +1,149 @@
+"""Сбор показателей текущего запроса.
+
+Middleware создаёт RequestMetrics и кладёт его в контекстную переменную;
+SQL-запросы, рендеринг шаблонов, обращения к кэшу и работа с миниатюрами
+дописывают в него свои показатели. Вне запроса сбор ничего не делает.
+"""
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.cache import caches
+from django.conf import settings
+
+_current = ContextVar('request_metrics', default=None)
+# Истина внутри get_many: BaseCache.get_many вызывает get для каждого
+# ключа, и такие обращения не должны учитываться второй раз.
+_in_get_many = ContextVar('in_cache_get_many', default=False)
+
+
+class RequestMetrics:
+    """Показатели одного запроса; длительности — в секундах."""
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.thumbnail_time = 0.0
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        """Обёртка для connection.execute_wrapper."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.sql_count += 1
+
+    def server_timing(self, total: float) -> str:
+        """Значение заголовка Server-Timing, длительности в миллисекундах."""
+        return ', '.join([
+            f'sql;dur={self.sql_time * 1000:.1f};'
+            f'desc="{self.sql_count} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="hits={self.cache_hits} misses={self.cache_misses}"',
+            f'thumb;dur={self.thumbnail_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def start() -> RequestMetrics:
+    metrics = RequestMetrics()
+    _current.set(metrics)
+    return metrics
+
+
+def finish() -> None:
+    _current.set(None)
+
+
+def current():
+    """Показатели текущего запроса или None вне запроса."""
+    return _current.get()
+
+
+@contextmanager
+def thumbnail_timer():
+    """Учитывает время работы с миниатюрами в текущем запросе."""
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.thumbnail_time += time.perf_counter() - started
+
+
+def _timed_render(render):
+    @functools.wraps(render)
+    def wrapper(self, context):
+        metrics = _current.get()
+        if metrics is None or metrics.template_depth:
+            return render(self, context)
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+            metrics.template_depth -= 1
+    wrapper.instrumented = True
+    return wrapper
+
+
+def _counted_get(get):
+    @functools.wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        value = get(self, key, default, version)
+        metrics = _current.get()
+        if metrics is not None and not _in_get_many.get():
+            if value is default:
+                metrics.cache_misses += 1
+            else:
+                metrics.cache_hits += 1
+        return value
+    wrapper.instrumented = True
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    @functools.wraps(get_many)
+    def wrapper(self, keys, version=None):
+        keys = list(keys)
+        token = _in_get_many.set(True)
+        try:
+            values = get_many(self, keys, version)
+        finally:
+            _in_get_many.reset(token)
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.cache_hits += len(values)
+            metrics.cache_misses += len(keys) - len(values)
+        return values
+    wrapper.instrumented = True
+    return wrapper
+
+
+def _patch(cls, name: str, decorator) -> None:
+    method = getattr(cls, name)
+    if not getattr(method, 'instrumented', False):
+        setattr(cls, name, decorator(method))
+
+
+def install() -> None:
+    """Подключает учёт шаблонов и кэша; повторный вызов безопасен.
+
+    Вложенные шаблоны ({% include %}) не суммируются с внешним: время
+    рендеринга считается только для шаблона верхнего уровня.
+    """
+    from django.template.base import Template
+
+    _patch(Template, 'render', _timed_render)
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        _patch(backend, 'get', _counted_get)
+        _patch(backend, 'get_many', _counted_get_many)
@@ -0,0 +1,164 @@
+"""Очередь фоновых задач в базе данных без внешнего брокера.
+
+Задача ставится в очередь записью Job в текущей транзакции. Поэтому
+изменения, которые её порождают, нужно сохранять внутри
+transaction.atomic (как делают post_create и post_edit): тогда при откате
+не будет и задачи. В режиме autocommit Job записывается отдельно, уже
+после фиксации изменений, и при сбое между ними может потеряться.
+Выполняет очередь команда ``manage.py runworker``, захватывая
+задачи пачками. Упавшая задача повторяется с экспоненциальной задержкой,
+а после JOBS_MAX_ATTEMPTS попыток остаётся в статусе failed.
+
+Задачей может быть только функция, отмеченная декоратором @task;
+параметры передаются именованными аргументами и должны сериализоваться
+в JSON. При JOBS_EAGER = True задачи выполняются сразу после фиксации
+транзакции, без отдельного процесса, что удобно при разработке.
+"""
+import json
+import logging
+import random
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+from .sqlite import retry_locked
+
+logger = logging.getLogger(__name__)
+
+
+def task(func):
+    """Разрешает ставить функцию в очередь."""
+    func.job_name = f'{func.__module__}.{func.__qualname__}'
+    return func
+
+
+def _resolve(name: str):
+    func = import_string(name)
+    if getattr(func, 'job_name', None) != name:
+        raise ImportError(f'{name} не отмечена декоратором @task')
+    return func
+
+
+def enqueue(func, dedupe_key: str = None, delay: float = 0,
+            max_attempts: int = None, **payload) -> Job:
+    """Ставит задачу в очередь.
+
+    Если в очереди уже ждёт задача с тем же dedupe_key, новая не
+    создаётся и возвращается ожидающая.
+    """
+    job = Job(
+        name=func.job_name,
+        payload=json.dumps(payload),
+        dedupe_key=dedupe_key,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        if dedupe_key is None:
+            raise
+        existing = Job.objects.filter(
+            dedupe_key=dedupe_key, status=Job.PENDING
+        ).first()
+        if existing is not None:
+            return existing
+        # Ожидавшую задачу успели захватить: ставим новую.
+        job.save()
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: run(job.pk))
+    return job
+
+
+def backoff(attempts: int) -> float:
+    """Задержка перед следующей попыткой, секунды, со случайным разбросом."""
+    delay = min(settings.JOBS_BACKOFF * 2 ** (attempts - 1),
+                settings.JOBS_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.5)
+
+
+def _release_stale(now) -> None:
+    """Возвращает в очередь задачи упавших обработчиков."""
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT),
+    )
+    pending_keys = Job.objects.filter(
+        status=Job.PENDING, dedupe_key__isnull=False
+    ).values('dedupe_key')
+    # Такую же задачу уже поставили заново, она и выполнит работу.
+    stale.filter(dedupe_key__in=pending_keys).delete()
+    stale.update(status=Job.PENDING, locked_by='', locked_at=None)
+
+
+@retry_locked
+def claim(limit: int) -> list:
+    """Захватывает до limit готовых к запуску задач, возвращает их id.
+
+    На базах с SELECT ... FOR UPDATE SKIP LOCKED обработчики не ждут друг
+    друга; в SQLite запись и так последовательна, а пересечения
+    отсекает условие status = pending в UPDATE.
+    """
+    token = uuid.uuid4().hex
+    now = timezone.now()
+    with transaction.atomic():
+        _release_stale(now)
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True).filter(
+                status=Job.PENDING, run_at__lte=now
+            ).values_list('id', flat=True)[:limit]
+        )
+        Job.objects.filter(id__in=ids, status=Job.PENDING).update(
+            status=Job.RUNNING, locked_by=token, locked_at=now
+        )
+    return list(
+        Job.objects.filter(locked_by=token).values_list('id', flat=True)
+    )
+
+
+def _fail(job: Job, error: str) -> None:
+    job.attempts += 1
+    job.last_error = error
+    job.locked_by, job.locked_at = '', None
+    if job.attempts >= job.max_attempts:
+        job.status = Job.FAILED
+        logger.error('Задача %s не выполнена:\n%s', job, error)
+    else:
+        job.status = Job.PENDING
+        job.run_at = timezone.now() + timedelta(seconds=backoff(job.attempts))
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        # В очереди уже ждёт такая же задача.
+        job.delete()
+
+
+def run(job_id: int) -> bool:
+    """Выполняет задачу; успешная удаляется из очереди."""
+    job = Job.objects.filter(id=job_id).first()
+    if job is None:
+        return False
+    try:
+        _resolve(job.name)(**json.loads(job.payload))
+    except Exception:
+        _fail(job, traceback.format_exc())
+        return False
+    Job.objects.filter(id=job.id).delete()
+    return True
+
+
+def run_in_worker(job_id: int) -> bool:
+    """run для пула потоков или процессов: со своим соединением с БД."""
+    close_old_connections()
+    try:
+        return run(job_id)
+    finally:
+        close_old_connections()
@@ -0,0 +1,109 @@
+import json
+import os
+import platform
+import tempfile
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from core import bench
+
+
+class Command(BaseCommand):
+    help = ('Наполняет тестовую базу синтетическими данными и замеряет '
+            'задержки, число запросов и размер ответа всех страниц.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--posts', type=int, default=500)
+        parser.add_argument('--comments', type=int, default=1000)
+        parser.add_argument('--follows', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Зерно генератора данных.')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Сколько раз замерять каждую страницу.')
+        parser.add_argument('--warmup', type=int, default=1,
+                            help='Прогревочные запросы без замера.')
+        parser.add_argument('--output', default='bench.json',
+                            help='Файл для результатов в формате JSON.')
+        parser.add_argument('--compare', default=None,
+                            help='JSON прошлого прогона для сравнения.')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Допустимый рост p95 при сравнении.')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть не меньше 1.')
+        previous = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                previous = json.load(file)['results']
+
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        # Отдельный экземпляр кэша, чтобы не смешивать данные замера
+        # с кэшем работающего сайта.
+        cache_dir = tempfile.TemporaryDirectory()
+        caches = {
+            alias: {**params,
+                    'LOCATION': os.path.join(cache_dir.name, alias)}
+            for alias, params in settings.CACHES.items()
+        }
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                CACHES=caches,
+            ):
+                dataset = bench.seed(
+                    users=options['users'],
+                    groups=options['groups'],
+                    posts=options['posts'],
+                    comments=options['comments'],
+                    follows=options['follows'],
+                    seed_value=options['seed'],
+                )
+                results = bench.run(options['repeat'], options['warmup'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            cache_dir.cleanup()
+
+        report = {
+            'created': timezone.now().isoformat(),
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'debug': settings.DEBUG,
+            'repeat': options['repeat'],
+            'dataset': dataset,
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+        self.stdout.write(
+            f"{'маршрут':<28}{'клиент':<8}{'код':>5}{'p50':>9}{'p95':>9}"
+            f"{'p99':>9}{'SQL':>6}{'байт':>9}"
+        )
+        for item in results:
+            self.stdout.write(
+                f"{item['route']:<28}{item['client']:<8}{item['status']:>5}"
+                f"{item['p50_ms']:>9.2f}{item['p95_ms']:>9.2f}"
+                f"{item['p99_ms']:>9.2f}{item['queries']:>6}"
+                f"{item['bytes']:>9}"
+            )
+        self.stdout.write(f"Результаты сохранены в {options['output']}")
+
+        if previous is not None:
+            regressions = bench.compare(previous, results,
+                                        options['tolerance'])
+            if regressions:
+                raise CommandError(
+                    'Обнаружены регрессии:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write('Регрессий нет.')
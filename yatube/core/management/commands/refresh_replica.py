@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core import replicas
+
+
+class Command(BaseCommand):
+    help = 'Обновляет SQLite-реплики копией основной базы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'aliases', nargs='*',
+            help='Реплики из DATABASES (по умолчанию все DATABASE_REPLICAS).'
+        )
+        parser.add_argument(
+            '--pages', type=int, default=1024,
+            help='Страниц за шаг копирования.'
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help='Пауза между шагами, секунды.'
+        )
+        parser.add_argument(
+            '--every', type=float, default=0,
+            help='Повторять каждые N секунд.'
+        )
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or settings.DATABASE_REPLICAS
+        if not aliases:
+            raise CommandError('Реплики не настроены: DATABASE_REPLICAS пуст.')
+        source = self.sqlite_path(DEFAULT_DB_ALIAS)
+        targets = {alias: self.sqlite_path(alias) for alias in aliases}
+        while True:
+            for alias, target in targets.items():
+                started = time.perf_counter()
+                replicas.copy_database(source, target, options['pages'],
+                                       options['pause'])
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{alias}: {elapsed:.2f} с')
+            if not options['every']:
+                break
+            time.sleep(options['every'])
+
+    def sqlite_path(self, alias: str) -> str:
+        if alias not in settings.DATABASES:
+            raise CommandError(f'База {alias} не описана в DATABASES.')
+        database = connections[alias].settings_dict
+        if database['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError(f'База {alias} не SQLite.')
+        return database['NAME']
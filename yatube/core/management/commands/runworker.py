@@ -0,0 +1,78 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в пуле потоков или процессов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.JOBS_WORKERS,
+            help='Размер пула; при 1 задачи выполняются в текущем потоке.'
+        )
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Пул процессов вместо пула потоков (для задач на CPU).'
+        )
+        parser.add_argument(
+            '--batch', type=int, default=None,
+            help='Сколько задач захватывать за раз (по умолчанию — '
+                 'размер пула).'
+        )
+        parser.add_argument(
+            '--poll', type=float, default=1.0,
+            help='Пауза между проверками пустой очереди, секунды.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться.'
+        )
+
+    def make_pool(self, workers: int, processes: bool):
+        """Пул для выполнения задач или None для работы в текущем потоке."""
+        if processes:
+            return ProcessPoolExecutor(max_workers=workers,
+                                       initializer=django.setup)
+        if workers > 1:
+            return ThreadPoolExecutor(max_workers=workers,
+                                      thread_name_prefix='jobs')
+        return None
+
+    def dispatch(self, pool, ids: list, processes: bool):
+        """Выполняет захваченные задачи, возвращает их результаты."""
+        if pool is None:
+            return map(jobs.run, ids)
+        if processes:
+            # Дочерние процессы не должны наследовать соединение.
+            connections.close_all()
+        return pool.map(jobs.run_in_worker, ids)
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        batch = options['batch'] or workers
+        pool = self.make_pool(workers, options['processes'])
+        done = failed = 0
+        try:
+            while True:
+                ids = jobs.claim(batch)
+                if not ids:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+                for ok in self.dispatch(pool, ids, options['processes']):
+                    done += ok
+                    failed += not ok
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        self.stdout.write(f'Выполнено задач: {done}, с ошибкой: {failed}')
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+INCREMENTAL = 2
+
+
+class Command(BaseCommand):
+    help = ('Обслуживание базы SQLite: контрольная точка WAL, сбор '
+            'статистики для планировщика и инкрементальная очистка.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default='default',
+            help='Псевдоним базы из DATABASES.'
+        )
+        parser.add_argument(
+            '--vacuum-pages', type=int, default=1000,
+            help='Сколько свободных страниц вернуть системе за запуск.'
+        )
+        parser.add_argument(
+            '--enable-incremental', action='store_true',
+            help='Включить auto_vacuum = INCREMENTAL (выполняет полный '
+                 'VACUUM один раз).'
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite.')
+        with connection.cursor() as cursor:
+            if options['enable_incremental']:
+                cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                cursor.execute('VACUUM')
+            cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            busy, log, checkpointed = cursor.fetchone()
+            self.stdout.write(
+                f'WAL: {checkpointed} из {log} страниц, занято: {busy}'
+            )
+            cursor.execute('ANALYZE')
+            self.stdout.write('ANALYZE выполнен')
+            cursor.execute('PRAGMA auto_vacuum')
+            auto_vacuum, = cursor.fetchone()
+            if auto_vacuum != INCREMENTAL:
+                self.stdout.write(
+                    'Инкрементальная очистка выключена, '
+                    'см. --enable-incremental'
+                )
+                return
+            cursor.execute('PRAGMA freelist_count')
+            before, = cursor.fetchone()
+            cursor.execute(
+                f'PRAGMA incremental_vacuum({options["vacuum_pages"]})'
+            )
+            cursor.fetchall()
+            cursor.execute('PRAGMA freelist_count')
+            after, = cursor.fetchone()
+            self.stdout.write(f'Освобождено страниц: {before - after}')
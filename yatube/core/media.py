@@ -0,0 +1,143 @@
+"""Отдача загруженных файлов (картинки постов и миниатюры).
+
+После проверок файл передаётся фронтенд-серверу: nginx получает
+заголовок X-Accel-Redirect, Apache и lighttpd — X-Sendfile, и рабочий
+процесс Python сразу освобождается. Без фронтенд-сервера
+(MEDIA_SENDFILE = None) файл отдаётся потоком с поддержкой Range,
+ETag и If-None-Match.
+
+Навсегда (immutable) кэшируются только файлы из MEDIA_IMMUTABLE_PREFIXES,
+имена которых никогда не переиспользуются: обработанные картинки со
+случайной частью имени и миниатюры, построенные по ним. Имя исходной
+загрузки освобождается после обработки, и FileSystemStorage может
+выдать его снова другому файлу, поэтому остальные ответы кэшируются на
+MEDIA_MAX_AGE секунд и затем проверяются по ETag.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified, StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.http import http_date
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+CHUNK_SIZE = 64 * 1024
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def resolve(path: str) -> str:
+    """Путь к файлу в MEDIA_ROOT; Http404 для чужих и отсутствующих."""
+    name = posixpath.normpath(path)
+    if not name.startswith(settings.MEDIA_PUBLIC_PREFIXES):
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, name)
+    except ValueError:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    return full_path
+
+
+def cache_control(path: str) -> str:
+    """Cache-Control для файла по его пути в MEDIA_ROOT."""
+    if posixpath.normpath(path).startswith(
+            settings.MEDIA_IMMUTABLE_PREFIXES):
+        return IMMUTABLE
+    return f'public, max-age={settings.MEDIA_MAX_AGE}'
+
+
+def etag_for(stat) -> str:
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header: str, size: int):
+    """Границы (start, end) одного диапазона байтов или None.
+
+    Несколько диапазонов в одном запросе не поддерживаются: такой
+    заголовок игнорируется, и отдаётся весь файл. Для диапазона за
+    пределами файла возвращается (size, size).
+    """
+    match = RANGE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return size, size
+    return start, end
+
+
+def _read_range(path: str, start: int, length: int):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def sendfile(full_path: str, content_type: str) -> HttpResponse:
+    """Ответ без тела, файл отдаёт фронтенд-сервер."""
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        name = os.path.relpath(full_path, settings.MEDIA_ROOT)
+        response['X-Accel-Redirect'] = quote(
+            settings.MEDIA_ACCEL_PREFIX + name.replace(os.sep, '/')
+        )
+    else:
+        response['X-Sendfile'] = full_path
+    return response
+
+
+def serve(request, path: str) -> HttpResponse:
+    full_path = resolve(path)
+    content_type = mimetypes.guess_type(full_path)[0]
+    content_type = content_type or 'application/octet-stream'
+    if settings.MEDIA_SENDFILE:
+        response = sendfile(full_path, content_type)
+        response['Cache-Control'] = cache_control(path)
+        return response
+    stat = os.stat(full_path)
+    etag = etag_for(stat)
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        response = HttpResponseNotModified()
+    else:
+        byte_range = None
+        if_range = request.META.get('HTTP_IF_RANGE', etag)
+        if 'HTTP_RANGE' in request.META and if_range == etag:
+            byte_range = parse_range(request.META['HTTP_RANGE'],
+                                     stat.st_size)
+        if byte_range is None:
+            response = FileResponse(open(full_path, 'rb'),
+                                    content_type=content_type)
+        elif byte_range == (stat.st_size, stat.st_size):
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                _read_range(full_path, start, length),
+                status=206, content_type=content_type
+            )
+            response['Content-Length'] = length
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control(path)
+    return response
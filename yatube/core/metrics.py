@@ -0,0 +1,193 @@
+"""Агрегированные метрики запросов в текстовом формате Prometheus.
+
+Каждый процесс копит показатели в памяти и не чаще раза в
+METRICS_FLUSH_INTERVAL секунд сохраняет их в свой файл в METRICS_DIR.
+Prometheus опрашивает /metrics/ случайного рабочего процесса gunicorn,
+поэтому ответ суммирует файлы всех процессов, а не только показатели
+ответившего: иначе счётчики скакали бы от опроса к опросу. Файлы
+завершившихся процессов остаются и учитываются, чтобы счётчики не
+уменьшались; каталог очищают при перезапуске сервиса. Без METRICS_DIR
+отдаются показатели одного процесса.
+"""
+import bisect
+import glob
+import os
+import pickle
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+
+
+class Histogram:
+    """Гистограмма с накопительными корзинами, как в клиенте Prometheus."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def cumulative(self):
+        """Пары (граница корзины, накопленное число наблюдений)."""
+        total = 0
+        bounds = [*(repr(bound) for bound in self.buckets), '+Inf']
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            yield bound, total
+
+
+class Registry:
+    """Набор гистограмм и счётчиков с метками."""
+
+    def __init__(self):
+        self.histograms = defaultdict(dict)
+        self.counters = defaultdict(lambda: defaultdict(float))
+        self.help = {}
+        self.flushed = 0.0
+
+    def describe(self, name: str, text: str) -> None:
+        self.help[name] = text
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            histogram = self.histograms[name].get(key)
+            if histogram is None:
+                histogram = self.histograms[name][key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            self.counters[name][key] += value
+
+    def clear(self) -> None:
+        with _lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.flushed = 0.0
+
+    def snapshot(self) -> dict:
+        """Показатели процесса в виде, пригодном для pickle."""
+        with _lock:
+            return {
+                'histograms': {
+                    name: {key: (list(histogram.counts), histogram.sum)
+                           for key, histogram in series.items()}
+                    for name, series in self.histograms.items()
+                },
+                'counters': {name: dict(series)
+                             for name, series in self.counters.items()},
+            }
+
+    def flush(self, directory: str) -> None:
+        """Сохраняет показатели процесса в directory/<pid>.pickle."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.pickle')
+        temporary = f'{path}.tmp'
+        with open(temporary, 'wb') as file:
+            pickle.dump(self.snapshot(), file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+        self.flushed = time.monotonic()
+
+    def maybe_flush(self) -> None:
+        """flush, если с прошлого прошло METRICS_FLUSH_INTERVAL секунд."""
+        directory = settings.METRICS_DIR
+        interval = settings.METRICS_FLUSH_INTERVAL
+        if directory and time.monotonic() - self.flushed >= interval:
+            self.flush(directory)
+
+    def collect(self) -> dict:
+        """Сумма показателей всех процессов из METRICS_DIR."""
+        directory = settings.METRICS_DIR
+        if not directory:
+            return self.snapshot()
+        self.flush(directory)
+        histograms = defaultdict(dict)
+        counters = defaultdict(lambda: defaultdict(float))
+        for path in glob.glob(os.path.join(directory, '*.pickle')):
+            try:
+                with open(path, 'rb') as file:
+                    data = pickle.load(file)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                continue
+            for name, series in data['histograms'].items():
+                for key, (counts, total) in series.items():
+                    merged = histograms[name].get(key)
+                    if merged is None:
+                        histograms[name][key] = (list(counts), total)
+                        continue
+                    histograms[name][key] = (
+                        [a + b for a, b in zip(merged[0], counts)],
+                        merged[1] + total,
+                    )
+            for name, series in data['counters'].items():
+                for key, value in series.items():
+                    counters[name][key] += value
+        return {'histograms': histograms, 'counters': counters}
+
+    def render(self) -> str:
+        """Текстовое представление всех метрик для Prometheus."""
+        data = self.collect()
+        lines = []
+        for name, series in sorted(data['histograms'].items()):
+            self._header(lines, name, 'histogram')
+            for key, (counts, total) in sorted(series.items()):
+                histogram = Histogram()
+                histogram.counts, histogram.sum = counts, total
+                for bound, cumulative in histogram.cumulative():
+                    labels = _labels(key + (('le', bound),))
+                    lines.append(f'{name}_bucket{labels} {cumulative}')
+                labels = _labels(key)
+                lines.append(f'{name}_sum{labels} {histogram.sum!r}')
+                lines.append(f'{name}_count{labels} {histogram.count}')
+        for name, series in sorted(data['counters'].items()):
+            self._header(lines, name, 'counter')
+            for key, value in sorted(series.items()):
+                lines.append(f'{name}{_labels(key)} {value!r}')
+        return '\n'.join(lines) + '\n'
+
+    def _header(self, lines: list, name: str, kind: str) -> None:
+        if name in self.help:
+            lines.append(f'# HELP {name} {self.help[name]}')
+        lines.append(f'# TYPE {name} {kind}')
+
+
+def _escape(value) -> str:
+    return (str(value).replace('\\', '\\\\')
+            .replace('\n', '\\n').replace('"', '\\"'))
+
+
+def _labels(key: tuple) -> str:
+    if not key:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in key)
+    return '{' + pairs + '}'
+
+
+registry = Registry()
+registry.describe('yatube_request_duration_seconds',
+                  'Время обработки запроса по имени представления.')
+registry.describe('yatube_sql_duration_seconds',
+                  'Время SQL-запросов за запрос по имени представления.')
+registry.describe('yatube_template_duration_seconds',
+                  'Время рендеринга шаблонов за запрос.')
+registry.describe('yatube_thumbnail_duration_seconds',
+                  'Время работы с миниатюрами за запрос.')
+registry.describe('yatube_requests_total', 'Число обработанных запросов.')
+registry.describe('yatube_sql_queries_total', 'Число SQL-запросов.')
+registry.describe('yatube_cache_hits_total', 'Попадания в кэш.')
+registry.describe('yatube_cache_misses_total', 'Промахи кэша.')
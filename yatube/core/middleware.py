@@ -0,0 +1,190 @@
+import re
+import time
+import zlib
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import connections
+from django.http import FileResponse, HttpResponseNotModified
+from django.middleware.gzip import GZipMiddleware, re_accepts_gzip
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from . import instrumentation, replicas, storage
+from .metrics import registry
+
+
+class InstrumentationMiddleware:
+    """Middleware для учёта SQL, шаблонов, кэша и миниатюр в запросе.
+
+    Показатели отдаются в заголовке Server-Timing и добавляются в
+    гистограммы по имени представления для /metrics.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = instrumentation.start()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.sql_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            instrumentation.finish()
+        total = time.perf_counter() - started
+        response['Server-Timing'] = metrics.server_timing(total)
+        self.record(request, response, metrics, total)
+        return response
+
+    def record(self, request, response, metrics, total):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else '<unresolved>'
+        registry.observe('yatube_request_duration_seconds', total, view=view)
+        registry.observe('yatube_sql_duration_seconds', metrics.sql_time,
+                         view=view)
+        registry.observe('yatube_template_duration_seconds',
+                         metrics.template_time, view=view)
+        registry.observe('yatube_thumbnail_duration_seconds',
+                         metrics.thumbnail_time, view=view)
+        registry.inc('yatube_requests_total', view=view,
+                     status=response.status_code)
+        registry.inc('yatube_sql_queries_total', metrics.sql_count, view=view)
+        registry.inc('yatube_cache_hits_total', metrics.cache_hits, view=view)
+        registry.inc('yatube_cache_misses_total', metrics.cache_misses,
+                     view=view)
+        registry.maybe_flush()
+
+
+class ReplicaPinningMiddleware:
+    """Middleware для чтения своих записей при работе с репликами.
+
+    Ставится после SessionMiddleware: отметка о закреплении за основной
+    базой хранится в сессии пользователя.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replicas.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            replicas.finish(request)
+        return response
+
+
+class StaticFilesMiddleware:
+    """Middleware, отдающий собранную статику без внешнего веб-сервера.
+
+    Файлы из STATIC_ROOT находятся один раз при запуске процесса, поэтому
+    новые файлы после collectstatic видны после перезапуска. Файлы с
+    хешем в имени кэшируются браузером навсегда, остальные — на
+    STATIC_MAX_AGE секунд. Клиентам, принимающим gzip, отдаются сжатые
+    копии, созданные collectstatic.
+    """
+
+    IMMUTABLE = 'public, max-age=31536000, immutable'
+    accepts_gzip = re.compile(r'\bgzip\b')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+        self.files = storage.collect_files(
+            settings.STATIC_ROOT, settings.STATIC_URL, hashed_files.values()
+        )
+
+    def __call__(self, request):
+        static_file = None
+        if request.method in ('GET', 'HEAD'):
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return self.get_response(request)
+        return self.serve(request, static_file)
+
+    def serve(self, request, static_file):
+        if not was_modified_since(
+                request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                static_file.mtime, static_file.size):
+            response = HttpResponseNotModified()
+        else:
+            path = static_file.path
+            encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+            use_gzip = (static_file.gzip_path
+                        and self.accepts_gzip.search(encoding))
+            if use_gzip:
+                path = static_file.gzip_path
+            response = FileResponse(
+                open(path, 'rb'), content_type=static_file.content_type
+            )
+            if use_gzip:
+                response['Content-Encoding'] = 'gzip'
+        if static_file.gzip_path:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        response['Last-Modified'] = http_date(static_file.mtime)
+        response['Cache-Control'] = (
+            self.IMMUTABLE if static_file.immutable
+            else f'public, max-age={settings.STATIC_MAX_AGE}'
+        )
+        return response
+
+
+def compress_sequence(sequence):
+    """Сжимает части потокового ответа в один поток gzip.
+
+    После каждой части поток сбрасывается (Z_SYNC_FLUSH), поэтому клиент
+    может распаковать всё полученное, не дожидаясь конца ответа.
+    compress_sequence из Django сбрасывает поток только в конце.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for item in sequence:
+        if item:
+            yield (compressor.compress(item)
+                   + compressor.flush(zlib.Z_SYNC_FLUSH))
+    yield compressor.flush()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZipMiddleware только для текстовых ответов.
+
+    Картинки и архивы уже сжаты, а частичные ответы (206) нельзя сжимать
+    без нарушения Content-Range. Потоковые ответы сжимаются по частям
+    функцией compress_sequence, и каждая часть уходит клиенту сжатой
+    сразу, как только готова.
+    """
+
+    COMPRESSIBLE_TYPES = (
+        'text/', 'application/json', 'application/javascript',
+        'application/xml', 'image/svg+xml',
+    )
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '')
+        if (response.status_code == 206
+                or not content_type.startswith(self.COMPRESSIBLE_TYPES)):
+            return response
+        if not response.streaming:
+            return super().process_response(request, response)
+        if response.has_header('Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not re_accepts_gzip.search(
+                request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return response
+        response.streaming_content = compress_sequence(
+            response.streaming_content
+        )
+        del response['Content-Length']
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            # Сжатое представление не совпадает побайтно с исходным.
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = 'gzip'
+        return response
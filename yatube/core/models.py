@@ -0,0 +1,88 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди, которую выполняет manage.py runworker."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Ожидает'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    name = models.CharField(
+        verbose_name='Задача',
+        max_length=200
+    )
+    payload = models.TextField(
+        verbose_name='Параметры (JSON)',
+        default='{}'
+    )
+    dedupe_key = models.CharField(
+        verbose_name='Ключ дедупликации',
+        max_length=200,
+        null=True,
+        blank=True
+    )
+    status = models.CharField(
+        verbose_name='Статус',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    attempts = models.PositiveIntegerField(
+        verbose_name='Попыток',
+        default=0
+    )
+    max_attempts = models.PositiveIntegerField(
+        verbose_name='Максимум попыток',
+        default=5
+    )
+    run_at = models.DateTimeField(
+        verbose_name='Запуск не раньше',
+        default=timezone.now
+    )
+    locked_by = models.CharField(
+        verbose_name='Захвачена',
+        max_length=32,
+        blank=True
+    )
+    locked_at = models.DateTimeField(
+        verbose_name='Время захвата',
+        null=True,
+        blank=True
+    )
+    last_error = models.TextField(
+        verbose_name='Последняя ошибка',
+        blank=True
+    )
+    created = models.DateTimeField(
+        verbose_name='Создана',
+        auto_now_add=True
+    )
+
+    class Meta:
+        ordering = ['run_at', 'id']
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at', 'id'],
+                name='core_job_claim_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=Q(status='pending'),
+                name='unique_pending_job'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
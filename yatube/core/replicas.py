@@ -0,0 +1,91 @@
+"""Чтение с реплик базы данных с «чтением своих записей».
+
+ReplicaRouter отправляет запросы на чтение на одну из баз
+DATABASE_REPLICAS, а запись — в основную базу default. Реплики
+используются только внутри веб-запроса: команды, обработчики очереди и
+транзакции читают основную базу, так как сразу работают с тем, что
+только что записали. После записи пользователь REPLICA_PIN_SECONDS
+секунд читает основную базу (отметка хранится в сессии), чтобы не
+увидеть отстающую реплику без своего поста или комментария.
+
+Для SQLite реплика — копия файла базы, которую обновляет команда
+``manage.py refresh_replica``.
+"""
+import random
+import sqlite3
+import time
+from contextlib import closing
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Сессии и очередь задач живут только в основной базе: их читают сразу
+# после записи, а задержка реплики здесь недопустима.
+PRIMARY_APPS = ('sessions', 'core')
+
+SESSION_KEY = '_db_pinned_until'
+
+_state = ContextVar('replica_state', default=None)
+
+
+class _RequestState:
+    def __init__(self, pinned: bool):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def start(request) -> None:
+    """Начинает запрос; закреплённые сессией читают основную базу."""
+    pinned_until = request.session.get(SESSION_KEY, 0)
+    _state.set(_RequestState(pinned_until > time.time()))
+
+
+def finish(request) -> None:
+    """Закрепляет за сессией основную базу, если в запросе была запись."""
+    state = _state.get()
+    _state.set(None)
+    if state is not None and state.wrote:
+        request.session[SESSION_KEY] = (
+            time.time() + settings.REPLICA_PIN_SECONDS
+        )
+
+
+class ReplicaRouter:
+    """Роутер баз данных: запись в default, чтение — с реплик."""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (state is None or state.pinned
+                or not settings.DATABASE_REPLICAS
+                or model._meta.app_label in PRIMARY_APPS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and model._meta.app_label not in PRIMARY_APPS:
+            # Дальше в этом запросе и после него читаем свою запись.
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в основной базе.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+def copy_database(source: str, target: str, pages: int = 1024,
+                  pause: float = 0.0) -> None:
+    """Копирует файл SQLite в реплику через backup API.
+
+    Копия пишется по pages страниц за шаг, поэтому запись в основную базу
+    блокируется лишь на время шага, а читатели реплики видят её целиком
+    в старом или новом состоянии.
+    """
+    with closing(sqlite3.connect(source)) as src, \
+            closing(sqlite3.connect(target)) as dst:
+        src.backup(dst, pages=pages, sleep=pause)
@@ -0,0 +1,78 @@
+"""Настройка соединений SQLite для работы нескольких процессов.
+
+При каждом новом соединении выполняются PRAGMA из SQLITE_PRAGMAS: режим
+WAL, при котором читатели не ждут писателя, synchronous = NORMAL,
+отображение файла в память, размер кэша страниц и busy_timeout, в
+течение которого SQLite сам ждёт освобождения блокировки.
+
+Если блокировка не освободилась и за busy_timeout, запросы вне
+транзакции повторяются до SQLITE_LOCK_RETRIES раз с растущей паузой.
+Запрос внутри транзакции так повторять нельзя: повторять нужно всю
+транзакцию, для этого служит декоратор retry_locked.
+"""
+import functools
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection as default_connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def is_locked(error: Exception) -> bool:
+    """Ошибка «database is locked» или «database table is locked»."""
+    return isinstance(error, OperationalError) and 'locked' in str(error)
+
+
+def _pause(attempt: int) -> None:
+    delay = settings.SQLITE_LOCK_BACKOFF * 2 ** attempt
+    time.sleep(delay * random.uniform(0.5, 1.5))
+
+
+def retry_execute(execute, sql, params, many, context):
+    """Обёртка execute_wrapper: повторяет запрос вне транзакции."""
+    attempt = 0
+    while True:
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as error:
+            if (not is_locked(error) or context['connection'].in_atomic_block
+                    or attempt >= settings.SQLITE_LOCK_RETRIES):
+                raise
+        _pause(attempt)
+        attempt += 1
+
+
+def retry_locked(func):
+    """Повторяет функцию с транзакцией целиком при блокировке базы.
+
+    Повтор выполняется, только если функция вызвана вне другой
+    транзакции: иначе откатывать и повторять должна внешняя.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        attempt = 0
+        while True:
+            outermost = not default_connection.in_atomic_block
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as error:
+                if (not outermost or not is_locked(error)
+                        or attempt >= settings.SQLITE_LOCK_RETRIES):
+                    raise
+            _pause(attempt)
+            attempt += 1
+    return wrapper
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    """Применяет PRAGMA и подключает повтор запросов к соединению."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    if retry_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, retry_execute)
@@ -0,0 +1,88 @@
+"""Хранилище статики с хешами в именах и сжатыми копиями файлов.
+
+collectstatic сохраняет файлы под именами с хешем содержимого
+(ManifestStaticFilesStorage) и рядом кладёт gzip-копии текстовых
+файлов, которые отдаёт core.middleware.StaticFilesMiddleware. Пока
+collectstatic не запускался (разработка, тесты), {% static %} ведёт на
+исходные имена файлов вместо ошибки об отсутствии манифеста.
+"""
+import gzip
+import mimetypes
+import os
+from collections import namedtuple
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+# Расширения, которые имеет смысл сжимать: изображения и шрифты
+# WOFF уже сжаты.
+COMPRESSIBLE = (
+    '.css', '.js', '.map', '.json', '.svg', '.txt', '.xml', '.html',
+    '.ico', '.ttf', '.otf', '.eot',
+)
+
+# Сжатая копия сохраняется, только если она заметно меньше оригинала.
+MIN_RATIO = 0.95
+
+StaticFile = namedtuple(
+    'StaticFile', 'path gzip_path content_type mtime size immutable'
+)
+
+
+def compress(path: str) -> bool:
+    """Пишет path.gz рядом с файлом; возвращает, сохранена ли копия."""
+    with open(path, 'rb') as source:
+        data = source.read()
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) >= len(data) * MIN_RATIO:
+        if os.path.exists(path + '.gz'):
+            os.remove(path + '.gz')
+        return False
+    with open(path + '.gz', 'wb') as target:
+        target.write(compressed)
+    return True
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хешированные имена плюс gzip-копии после collectstatic."""
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Манифеста или записи в нём нет: отдаём исходное имя.
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                compress(self.path(name))
+
+
+def collect_files(root: str, url: str, immutable_names) -> dict:
+    """Описания файлов в root по URL вида url + имя файла."""
+    immutable_names = set(immutable_names)
+    files = {}
+    if not root or not os.path.isdir(root):
+        return files
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith('.gz'):
+                continue
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            gzip_path = path + '.gz'
+            stat = os.stat(path)
+            content_type, _ = mimetypes.guess_type(path)
+            files[url + name] = StaticFile(
+                path=path,
+                gzip_path=gzip_path if os.path.exists(gzip_path) else None,
+                content_type=content_type or 'application/octet-stream',
+                mtime=stat.st_mtime,
+                size=stat.st_size,
+                immutable=name in immutable_names,
+            )
+    return files
@@ -0,0 +1,95 @@
+"""Потоковый рендеринг страниц (StreamingHttpResponse).
+
+Шаблон отмечает тегом {% stream %} ... {% endstream %} часть страницы,
+которой нужны дорогие данные, например посты ленты. Сначала в
+представлении рендерится «оболочка» страницы, где вместо этих частей
+стоят метки, и её начало сразу уходит клиенту: браузер начинает
+загружать стили и картинки шапки. Затем вычисляются отложенные данные
+(deferred), и отмеченные части рендерятся с тем же контекстом, причём
+каждая итерация {% for %} верхнего уровня отдаётся отдельным куском.
+
+Оболочка рендерится внутри представления, поэтому CSRF-cookie, сессия и
+сообщения обрабатываются middleware как обычно. Отмеченные части
+рендерятся уже после middleware и не должны использовать {% csrf_token %}
+и другие данные, требующие обработки ответа.
+"""
+import secrets
+
+from django.http import StreamingHttpResponse
+from django.template import Context, loader
+from django.template.context import make_context
+from django.template.defaulttags import ForNode
+
+
+class StreamState:
+    """Метка и отложенные части при рендеринге оболочки."""
+
+    def __init__(self):
+        self.marker = f'<!--stream-{secrets.token_hex(8)}-->'
+        self.parts = []
+
+
+def iter_nodes(nodelist, context):
+    """Рендерит узлы по одному, циклы {% for %} — по итерациям."""
+    for node in nodelist:
+        if isinstance(node, ForNode) and len(node.loopvars) == 1:
+            yield from iter_for(node, context)
+        else:
+            yield node.render_annotated(context)
+
+
+def iter_for(node: ForNode, context):
+    """Аналог ForNode.render, отдающий каждую итерацию отдельно."""
+    parentloop = context['forloop'] if 'forloop' in context else {}
+    with context.push():
+        values = node.sequence.resolve(context, ignore_failures=True)
+        if values is None:
+            values = []
+        if not hasattr(values, '__len__'):
+            values = list(values)
+        length = len(values)
+        if not length:
+            yield node.nodelist_empty.render(context)
+            return
+        if node.is_reversed:
+            values = reversed(values)
+        loop = context['forloop'] = {'parentloop': parentloop}
+        for index, item in enumerate(values):
+            loop.update(
+                counter0=index, counter=index + 1,
+                revcounter=length - index, revcounter0=length - index - 1,
+                first=index == 0, last=index == length - 1,
+            )
+            context[node.loopvars[0]] = item
+            yield ''.join(
+                item_node.render_annotated(context)
+                for item_node in node.nodelist_loop
+            )
+
+
+def render_stream(request, template_name: str, context: dict = None,
+                  **deferred) -> StreamingHttpResponse:
+    """Потоковый аналог render().
+
+    deferred — функции без аргументов, результаты которых добавляются в
+    контекст отмеченных {% stream %} частей после отправки оболочки.
+    """
+    template = loader.get_template(template_name).template
+    state = StreamState()
+    shell_context = make_context(context or {}, request,
+                                 autoescape=template.engine.autoescape)
+    shell_context.stream_state = state
+    pieces = template.render(shell_context).split(state.marker)
+
+    def chunks():
+        yield pieces[0]
+        values = {name: func() for name, func in deferred.items()}
+        for (nodelist, snapshot), tail in zip(state.parts, pieces[1:]):
+            part_context = Context({**snapshot, **values},
+                                   autoescape=template.engine.autoescape)
+            with part_context.render_context.push_state(template), \
+                    part_context.bind_template(template):
+                yield from iter_nodes(nodelist, part_context)
+            yield tail
+
+    return StreamingHttpResponse(chunks())
@@ -0,0 +1,24 @@
+from django import template
+
+register = template.Library()
+
+
+class StreamNode(template.Node):
+    def __init__(self, nodelist):
+        self.nodelist = nodelist
+
+    def render(self, context):
+        state = getattr(context, 'stream_state', None)
+        if state is None:
+            return self.nodelist.render(context)
+        state.parts.append((self.nodelist, context.flatten()))
+        return state.marker
+
+
+@register.tag
+def stream(parser, token):
+    """Часть страницы, которая при потоковом рендеринге отдаётся
+    после оболочки, см. core.streaming."""
+    nodelist = parser.parse(('endstream',))
+    parser.delete_first_token()
+    return StreamNode(nodelist)
@@ -0,0 +1,86 @@
+"""Вспомогательные средства для тестов производительности."""
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+
+class QueryBudgetMixin:
+    """Примесь к TestCase для проверки бюджета SQL-запросов страницы.
+
+    Страница запрашивается при нескольких размерах PAGE с пустым кэшем:
+    число запросов не должно превышать бюджет и не должно расти вместе с
+    количеством выводимых объектов (признак N+1).
+    """
+
+    page_sizes = (1, 10)
+
+    def assertQueryBudget(self, client, url, budget):
+        counts = {}
+        for page_size in self.page_sizes:
+            with override_settings(PAGE=page_size):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(url)
+            self.assertLess(response.status_code, 400, url)
+            counts[page_size] = len(queries)
+            self.assertLessEqual(
+                len(queries), budget,
+                f'{url}: {len(queries)} запросов при PAGE={page_size}, '
+                f'бюджет {budget}:\n'
+                + '\n'.join(query['sql'] for query in queries.captured_queries)
+            )
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f'{url}: число запросов растёт с размером страницы {counts}'
+        )
+
+
+# Просмотр таблицы: SQLite 3.36+ пишет «SCAN t», старые версии —
+# «SCAN TABLE t»; полным он считается, если не идёт по индексу (USING).
+SCAN = re.compile(r'^SCAN (TABLE )?(?P<table>\S+)')
+
+
+class QueryPlanMixin:
+    """Примесь к TestCase для проверки планов запросов страницы (SQLite).
+
+    Каждый SELECT, выполненный при запросе страницы, повторяется с
+    EXPLAIN QUERY PLAN. План не должен содержать полного просмотра
+    таблицы или сортировки во временном B-дереве.
+    """
+
+    # Таблицы, которые допустимо читать целиком. subquery — псевдоним,
+    # под которым Django оборачивает count() аннотированных запросов;
+    # план самого подзапроса проверяется отдельными строками.
+    scan_allowed = ('subquery',)
+
+    def explain(self, sql: str) -> list:
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def plan_problems(self, sql: str) -> list:
+        problems = []
+        for detail in self.explain(sql):
+            if 'USE TEMP B-TREE' in detail:
+                problems.append(detail)
+            match = SCAN.match(detail)
+            if (match and 'USING' not in detail
+                    and match.group('table') not in self.scan_allowed):
+                problems.append(detail)
+        return problems
+
+    def assertIndexedPlans(self, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertLess(response.status_code, 400, url)
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            problems = self.plan_problems(sql)
+            self.assertFalse(
+                problems, f'{url}: {sql}\n' + '\n'.join(problems)
+            )
@@ -1,6 +1,47 @@
+import gzip
+import json
+import multiprocessing
+import os
+import pickle
+import sqlite3
+import tempfile
+import zlib
+from contextlib import closing
+from datetime import timedelta
 from http import HTTPStatus
+from io import StringIO
+from types import SimpleNamespace
 
-from django.test import Client, TestCase
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import OperationalError, connection
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from core import bench, instrumentation, jobs, loaders, replicas, sqlite
+from core.cache import SQLiteCache
+from core.middleware import CompressionMiddleware, StaticFilesMiddleware
+from core.metrics import Histogram, Registry, registry
+from core.models import Job
+from posts.models import Group, Post
+
+calls = []
+
+
+@jobs.task
+def record(value):
+    calls.append(value)
+
+
+@jobs.task
+def broken():
+    raise ValueError('сбой')
 
 
 class ViewTestClass(TestCase):
@@ -11,3 +52,562 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class BenchTest(TestCase):
+    def test_percentile(self):
+        samples = list(range(1, 101))
+        self.assertEqual(bench.percentile(samples, 50), 50)
+        self.assertEqual(bench.percentile(samples, 99), 99)
+        self.assertEqual(bench.percentile([7], 95), 7)
+
+    def test_run_covers_all_routes(self):
+        """Замер проходит по всем маршрутам posts, users, about и api."""
+        bench.seed(users=4, groups=1, posts=6, comments=6, follows=3)
+        results = bench.run(repeat=2, warmup=0)
+        routes = {item['route'] for item in results}
+        self.assertEqual(routes, {name for name, _ in bench.discover_routes()})
+        self.assertIn('posts:post_detail', routes)
+        self.assertIn('users:login', routes)
+        self.assertIn('about:tech', routes)
+        for item in results:
+            with self.subTest(route=item['route'], client=item['client']):
+                self.assertLess(item['status'], 400)
+                self.assertLessEqual(item['p50_ms'], item['p99_ms'])
+
+    def test_compare_reports_regressions(self):
+        old = [{'route': 'posts:index', 'client': 'guest',
+                'p95_ms': 10.0, 'queries': 2}]
+        new = [{'route': 'posts:index', 'client': 'guest',
+                'p95_ms': 11.0, 'queries': 3}]
+        self.assertEqual(len(bench.compare(old, new, tolerance=0.2)), 1)
+        self.assertEqual(bench.compare(old, old), [])
+
+
+class InstrumentationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = get_user_model().objects.create_user(username='author')
+        Post.objects.create(author=author, text='Тестовый текст')
+
+    def setUp(self):
+        registry.clear()
+        cache.clear()
+        self.client = Client()
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for name in ('sql;dur=', 'tpl;dur=', 'cache;desc=', 'thumb;dur=',
+                     'total;dur='):
+            with self.subTest(name=name):
+                self.assertIn(name, timing)
+        self.assertIn('2 queries', timing)
+        # Единственное попадание — версия ленты, которую создала проверка
+        # условного GET и прочитал пагинатор вместе с числом постов.
+        self.assertIn('hits=1 ', timing)
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn('misses=0', response['Server-Timing'])
+
+    def test_cache_get_many_counted_once(self):
+        """Ключи get_many не учитываются повторно через get."""
+        cache.set('present', 1)
+        metrics = instrumentation.start()
+        try:
+            cache.get_many(['present', 'missing'])
+            cache.get('present')
+        finally:
+            instrumentation.finish()
+        self.assertEqual((metrics.cache_hits, metrics.cache_misses), (2, 1))
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_metrics_restricted_to_staff(self):
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('core:metrics'))
+        self.assertEqual(response.status_code, 403)
+        staff = get_user_model().objects.create_user(
+            username='staff', is_staff=True
+        )
+        self.client.force_login(staff)
+        response = self.client.get(reverse('core:metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(
+            response,
+            'yatube_request_duration_seconds_count{view="posts:index"} 1'
+        )
+        self.assertContains(
+            response, 'yatube_sql_queries_total{view="posts:index"} 2.0'
+        )
+
+    def test_metrics_closed_by_default(self):
+        response = self.client.get(reverse('core:metrics'),
+                                   REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.5'])
+    def test_metrics_allowed_ip(self):
+        response = self.client.get(reverse('core:metrics'),
+                                   REMOTE_ADDR='10.0.0.5')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+    def test_metrics_summed_across_processes(self):
+        """/metrics/ суммирует показатели всех рабочих процессов."""
+        other = Registry()
+        other.inc('yatube_requests_total', 2, view='posts:index')
+        other.observe('yatube_request_duration_seconds', 0.3,
+                      view='posts:index')
+        registry.inc('yatube_requests_total', 1, view='posts:index')
+        registry.observe('yatube_request_duration_seconds', 0.3,
+                         view='posts:index')
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, '1.pickle'), 'wb') as file:
+                pickle.dump(other.snapshot(), file)
+            with self.settings(METRICS_DIR=directory):
+                text = registry.render()
+                self.assertTrue(os.path.exists(
+                    os.path.join(directory, f'{os.getpid()}.pickle')))
+        self.assertIn(
+            'yatube_requests_total{view="posts:index"} 3.0', text)
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            text)
+        self.assertIn('yatube_request_duration_seconds_bucket'
+                      '{view="posts:index",le="0.5"} 2', text)
+
+    def test_histogram_buckets(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value)
+        self.assertEqual(list(histogram.cumulative()),
+                         [('0.1', 2), ('1.0', 3), ('+Inf', 4)])
+        self.assertEqual(histogram.count, 4)
+
+
+def _increment(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.directory.name, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_get_set_many(self):
+        self.cache.set('one', {'value': 1})
+        self.cache.set_many({'two': 2, 'three': [3]})
+        self.assertEqual(self.cache.get('one'), {'value': 1})
+        self.assertEqual(
+            self.cache.get_many(['two', 'three', 'missing']),
+            {'two': 2, 'three': [3]}
+        )
+        self.cache.delete_many(['one', 'two'])
+        self.assertIsNone(self.cache.get('one'))
+        self.assertEqual(self.cache.get('missing', 'default'), 'default')
+
+    def test_expired_values(self):
+        self.cache.set('gone', 1, timeout=0)
+        self.assertFalse(self.cache.has_key('gone'))
+        self.assertTrue(self.cache.add('gone', 2))
+        self.assertFalse(self.cache.add('gone', 3))
+        self.assertEqual(self.cache.get('gone'), 2)
+
+    def test_shared_between_processes(self):
+        """Процессы видят одни данные, а incr атомарен между ними."""
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=_increment, args=(self.location, 25))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.make_cache().get('counter'), 100)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_lru_eviction(self):
+        """При превышении объёма удаляются давно не читавшиеся записи."""
+        cache = self.make_cache(MAX_BYTES=3000, CULL_RATIO=1,
+                                ACCESS_RESOLUTION=0)
+        cache.set('old', 'x' * 900)
+        cache.set('used', 'x' * 900)
+        cache.set('other', 'x' * 900)
+        cache.get('old')
+        cache.set('new', 'x' * 900)
+        self.assertEqual(
+            set(cache.get_many(['old', 'used', 'other', 'new'])),
+            {'old', 'other', 'new'}
+        )
+        total, = cache._connection.execute(
+            'SELECT total FROM cache_size').fetchone()
+        self.assertLessEqual(total, 3000)
+
+
+class JobsTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        job = jobs.enqueue(record, value=1)
+        self.assertEqual(jobs.claim(10), [job.id])
+        self.assertEqual(jobs.claim(10), [])
+        self.assertTrue(jobs.run(job.id))
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.exists())
+
+    def test_dedupe_pending(self):
+        first = jobs.enqueue(record, dedupe_key='one', value=1)
+        second = jobs.enqueue(record, dedupe_key='one', value=2)
+        self.assertEqual(first.id, second.id)
+        jobs.claim(10)
+        third = jobs.enqueue(record, dedupe_key='one', value=3)
+        self.assertNotEqual(first.id, third.id)
+
+    def test_delayed_job_not_claimed(self):
+        jobs.enqueue(record, delay=60, value=1)
+        self.assertEqual(jobs.claim(10), [])
+
+    def test_only_tasks_run(self):
+        job = Job.objects.create(name='os.remove', payload='{"path": "x"}')
+        self.assertFalse(jobs.run(job.id))
+        job.refresh_from_db()
+        self.assertIn('@task', job.last_error)
+
+    @override_settings(JOBS_BACKOFF=10)
+    def test_retry_then_fail(self):
+        job = jobs.enqueue(broken, max_attempts=2)
+        jobs.claim(10)
+        self.assertFalse(jobs.run(job.id))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('ValueError', job.last_error)
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        jobs.claim(10)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run(job.id)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertEqual(jobs.claim(10), [])
+
+    @override_settings(JOBS_LOCK_TIMEOUT=60)
+    def test_stale_job_released(self):
+        job = jobs.enqueue(record, value=1)
+        jobs.claim(10)
+        Job.objects.filter(id=job.id).update(
+            locked_at=timezone.now() - timedelta(minutes=5)
+        )
+        self.assertEqual(jobs.claim(10), [job.id])
+
+    def test_runworker_once(self):
+        for value in range(3):
+            jobs.enqueue(record, value=value)
+        jobs.enqueue(broken)
+        out = StringIO()
+        call_command('runworker', once=True, workers=1, stdout=out)
+        self.assertEqual(calls, [0, 1, 2])
+        self.assertIn('Выполнено задач: 3, с ошибкой: 1', out.getvalue())
+        self.assertEqual(Job.objects.get().status, Job.PENDING)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = replicas.ReplicaRouter()
+        self.request = SimpleNamespace(session={})
+
+    def tearDown(self):
+        replicas.finish(self.request)
+
+    def test_reads_outside_request_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_reads_go_to_replica(self):
+        replicas.start(self.request)
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+        self.assertEqual(self.router.db_for_read(Session), 'default')
+        self.assertEqual(self.router.db_for_write(Session), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+
+    def test_write_pins_session_to_primary(self):
+        replicas.start(self.request)
+        self.assertEqual(self.router.db_for_write(Group), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        replicas.finish(self.request)
+        replicas.start(self.request)
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        replicas.finish(self.request)
+        self.request.session[replicas.SESSION_KEY] -= 60
+        replicas.start(self.request)
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+
+    def test_copy_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'db.sqlite3')
+            target = os.path.join(directory, 'replica.sqlite3')
+            with closing(sqlite3.connect(source)) as connection:
+                connection.execute('CREATE TABLE t (x INTEGER)')
+                connection.execute('INSERT INTO t VALUES (1)')
+                connection.commit()
+            replicas.copy_database(source, target)
+            with closing(sqlite3.connect(target)) as connection:
+                rows = connection.execute('SELECT x FROM t').fetchall()
+        self.assertEqual(rows, [(1,)])
+
+
+class ReplicaPinningMiddlewareTest(TestCase):
+    def test_write_marks_session(self):
+        user = get_user_model().objects.create_user(username='writer')
+        post = Post.objects.create(author=user, text='Пост')
+        client = Client()
+        client.get(reverse('posts:index'))
+        self.assertNotIn(replicas.SESSION_KEY, client.session)
+        client.force_login(user)
+        client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.id}),
+            data={'text': 'Комментарий'},
+        )
+        self.assertIn(replicas.SESSION_KEY, client.session)
+
+
+class SQLiteTest(SimpleTestCase):
+    databases = {'default'}
+
+    def test_pragmas_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone(), (1,))
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone(), (5000,))
+        self.assertIn(sqlite.retry_execute, connection.execute_wrappers)
+
+    @override_settings(SQLITE_LOCK_BACKOFF=0)
+    def test_locked_statement_retried(self):
+        errors = [OperationalError('database is locked')] * 2
+
+        def execute(sql, params, many, context):
+            if errors:
+                raise errors.pop()
+            return 'ok'
+
+        context = {'connection': SimpleNamespace(in_atomic_block=False)}
+        self.assertEqual(
+            sqlite.retry_execute(execute, 'SELECT 1', None, False, context),
+            'ok'
+        )
+        errors.append(OperationalError('database is locked'))
+        context['connection'].in_atomic_block = True
+        with self.assertRaises(OperationalError):
+            sqlite.retry_execute(execute, 'SELECT 1', None, False, context)
+
+    def test_maintenance_command(self):
+        out = StringIO()
+        call_command('sqlite_maintenance', stdout=out)
+        self.assertIn('ANALYZE', out.getvalue())
+
+
+class StaticFilesTest(SimpleTestCase):
+    def setUp(self):
+        self.source = tempfile.TemporaryDirectory()
+        self.root = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.source.name, 'css'))
+        with open(os.path.join(self.source.name, 'css', 'site.css'),
+                  'w') as css:
+            css.write('body { margin: 0; }\n' * 100)
+        self.settings = override_settings(
+            STATICFILES_DIRS=[self.source.name], STATIC_ROOT=self.root.name
+        )
+        self.settings.enable()
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        self.settings.disable()
+        self.source.cleanup()
+        self.root.cleanup()
+
+    def middleware(self):
+        return StaticFilesMiddleware(lambda request: HttpResponse('view'))
+
+    def test_missing_manifest_falls_back_to_plain_name(self):
+        self.assertEqual(staticfiles_storage.url('css/site.css'),
+                         '/static/css/site.css')
+
+    def test_collectstatic_hashes_and_compresses(self):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        url = staticfiles_storage.url('css/site.css')
+        self.assertRegex(url, r'^/static/css/site\.\w{12}\.css$')
+        self.assertTrue(os.path.exists(
+            os.path.join(self.root.name, url[len('/static/'):]) + '.gz'))
+        middleware = self.middleware()
+
+        response = middleware(
+            self.factory.get(url, HTTP_ACCEPT_ENCODING='gzip, br'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        response = middleware(self.factory.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+        response = middleware(self.factory.get('/static/css/site.css'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+
+        response = middleware(self.factory.get('/static/missing.css'))
+        self.assertEqual(response.content, b'view')
+
+
+class MediaTest(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.root.name, 'posts'))
+        with open(os.path.join(self.root.name, 'posts', 'a.jpg'), 'wb') as f:
+            f.write(b'0123456789')
+        with open(os.path.join(self.root.name, 'secret.txt'), 'wb') as f:
+            f.write(b'secret')
+        self.settings = override_settings(MEDIA_ROOT=self.root.name)
+        self.settings.enable()
+        self.url = reverse('core:media', kwargs={'path': 'posts/a.jpg'})
+
+    def tearDown(self):
+        self.settings.disable()
+        self.root.cleanup()
+
+    def test_full_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_immutable_only_for_unique_names(self):
+        """Навсегда кэшируются только файлы с неповторяющимися именами."""
+        directory = os.path.join(self.root.name, 'posts', 'normalized')
+        os.makedirs(directory)
+        with open(os.path.join(directory, 'a_1f2e3d4c.jpg'), 'wb') as f:
+            f.write(b'0123456789')
+        cases = {
+            'posts/normalized/a_1f2e3d4c.jpg': True,
+            'posts/a.jpg': False,
+        }
+        for path, immutable in cases.items():
+            with self.subTest(path=path):
+                response = self.client.get(f'/media/{path}')
+                self.assertEqual(
+                    'immutable' in response['Cache-Control'], immutable)
+
+    def test_ranges(self):
+        cases = {
+            'bytes=2-5': (b'2345', 'bytes 2-5/10'),
+            'bytes=7-': (b'789', 'bytes 7-9/10'),
+            'bytes=-3': (b'789', 'bytes 7-9/10'),
+        }
+        for header, (content, content_range) in cases.items():
+            with self.subTest(range=header):
+                response = self.client.get(self.url, HTTP_RANGE=header)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.PARTIAL_CONTENT)
+                self.assertEqual(b''.join(response.streaming_content),
+                                 content)
+                self.assertEqual(response['Content-Range'], content_range)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code,
+                         HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+        response = self.client.get(
+            self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_only_public_files(self):
+        for path in ('secret.txt', 'posts/../secret.txt', 'posts/none.jpg'):
+            with self.subTest(path=path):
+                response = self.client.get(f'/media/{path}')
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect')
+    def test_x_accel_redirect(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected-media/posts/a.jpg')
+        self.assertEqual(response.content, b'')
+
+
+class CompressionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = get_user_model().objects.create_user(username='author')
+        group = Group.objects.create(title='Группа', slug='group')
+        for number in range(10):
+            Post.objects.create(author=author, group=group,
+                                text=f'Пост номер {number} ' * 10)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_minify(self):
+        source = ('<div>\n    <p>\n      текст\n    </p>\n\n'
+                  '  <pre>\n  код\n</pre>\n</div>\n')
+        self.assertEqual(
+            loaders.minify(source),
+            '<div>\n<p>\nтекст\n</p>\n<pre>\n  код\n</pre>\n</div>'
+        )
+
+    def test_feed_page_compressed(self):
+        plain = self.client.get(reverse('posts:index')).content
+        self.assertNotRegex(plain.decode(), r'\n[ \t]')
+        response = self.client.get(reverse('posts:index'),
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain)
+        self.assertLess(len(response.content), len(plain) / 3)
+
+    def test_streaming_compressed(self):
+        response = self.client.get(reverse('api:index'),
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(len(json.loads(data)['results']), 10)
+
+    @override_settings(STREAMING_FEEDS=True)
+    def test_streaming_flushed_per_chunk(self):
+        """Первая сжатая часть распаковывается до конца ответа."""
+        plain = b''.join(
+            self.client.get(reverse('posts:index')).streaming_content
+        )
+        cache.clear()
+        response = self.client.get(reverse('posts:index'),
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        chunks = iter(response.streaming_content)
+        decompressor = zlib.decompressobj(31)
+        shell = decompressor.decompress(next(chunks)).decode()
+        self.assertIn('<head>', shell)
+        self.assertNotIn('Пост номер', shell)
+        rest = b''.join(decompressor.decompress(chunk) for chunk in chunks)
+        self.assertEqual(shell.encode() + rest, plain)
+
+    def test_binary_and_partial_not_compressed(self):
+        middleware = CompressionMiddleware(lambda request: None)
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        for response in (
+            HttpResponse(b'0' * 1000, content_type='image/png'),
+            HttpResponse(b'0' * 1000, content_type='text/plain', status=206),
+        ):
+            with self.subTest(response=response):
+                response = middleware.process_response(request, response)
+                self.assertFalse(response.has_header('Content-Encoding'))
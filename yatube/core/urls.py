@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.urls import path
+
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('metrics/', views.metrics, name='metrics'),
+    path(f'{settings.MEDIA_URL.lstrip("/")}<path:path>', views.media,
+         name='media'),
+]
@@ -1,5 +1,11 @@
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render
 
+from . import media as media_files
+from .metrics import registry
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +21,23 @@ def csrf_failure(request, reason=''):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+def metrics(request: HttpRequest) -> HttpResponse:
+    """Функция для выдачи метрик в формате Prometheus.
+    Доступна сотрудникам и адресам из METRICS_ALLOWED_IPS.
+    """
+    allowed = request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+    if not (allowed or request.user.is_staff):
+        raise PermissionDenied
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+def media(request: HttpRequest, path: str) -> HttpResponse:
+    """Функция для отдачи загруженных картинок и миниатюр.
+    Передаёт файл фронтенд-серверу или отдаёт его сама, см. core.media.
+    """
+    return media_files.serve(request, path)
@@ -0,0 +1,84 @@
+"""Версии объектов для инвалидации кэшированных карточек постов.
+
+Ключ фрагмента карточки включает версии поста, его автора и группы.
+Сигналы сохранения и удаления меняют версию, поэтому устаревший фрагмент
+просто перестаёт запрашиваться и вытесняется кэшем, а новая карточка
+рендерится сразу, без ожидания истечения таймаута.
+
+ETag и Last-Modified лент (posts.conditional) строятся по версиям лент,
+а не карточек, поэтому версию поста меняет только feed.bump_post, вместе
+с версиями всех лент, где выводится пост.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def post_key(pk: int) -> str:
+    return f'version:post:{pk}'
+
+
+def group_key(pk: int) -> str:
+    return f'version:group:{pk}'
+
+
+def user_key(pk: int) -> str:
+    return f'version:user:{pk}'
+
+
+def comments_key(pk: int) -> str:
+    return f'version:comments:{pk}'
+
+
+def feed_key(name: str, pk: int = None) -> str:
+    """Версия списка постов: index, group, author или follow."""
+    if pk is None:
+        return f'version:feed:{name}'
+    return f'version:feed:{name}:{pk}'
+
+
+# Меняется при переименовании автора или группы: их имена выводятся
+# в карточках любых лент.
+CARDS_KEY = 'version:cards'
+
+
+def get_versions(keys) -> dict:
+    """Возвращает версии по ключам, создавая недостающие."""
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
+
+
+def bump(*keys) -> None:
+    """Сменяет версии, делая зависящие от них фрагменты устаревшими."""
+    cache.set_many({key: time.time_ns() for key in keys}, None)
+
+
+def card_keys(post) -> list:
+    keys = [post_key(post.pk), user_key(post.author_id)]
+    if post.group_id:
+        keys.append(group_key(post.group_id))
+    return keys
+
+
+def attach_card_versions(page_obj) -> None:
+    """Проставляет постам страницы card_version для ключа фрагмента."""
+    posts = list(page_obj.object_list)
+    keys = {key for post in posts for key in card_keys(post)}
+    versions = get_versions(list(keys))
+    for post in posts:
+        post.card_version = '.'.join(
+            str(versions[key]) for key in card_keys(post)
+        )
+    page_obj.object_list = posts
+
+
+def post_feed_keys(post) -> list:
+    """Ключи лент, в которые попадает пост, включая прежнюю группу."""
+    keys = [feed_key('index'), feed_key('author', post.author_id)]
+    group_ids = {post.group_id, getattr(post, '_loaded_group_id', None)}
+    keys.extend(feed_key('group', pk) for pk in group_ids if pk)
+    return keys
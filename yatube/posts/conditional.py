@@ -0,0 +1,127 @@
+"""Условный GET для лент и страницы поста.
+
+ETag и Last-Modified считаются по версиям из posts.caching без рендеринга
+шаблона: на проверку уходит одно обращение к кэшу и, для страниц группы,
+профиля и поста, один короткий запрос за идентификаторами. В ETag также
+входят пользователь, CSRF-cookie и строка запроса, так как от них зависит
+HTML страницы. Версии хранятся в кэше, поэтому после изменения шаблонов
+достаточно очистить кэш, чтобы клиенты получили новую разметку.
+"""
+import functools
+import hashlib
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import condition
+
+from . import caching
+from .models import Group, Post, User
+
+
+def index_keys(request) -> list:
+    return [caching.feed_key('index')]
+
+
+def group_keys(request, slug: str):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'id', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return [caching.group_key(group_id), caching.feed_key('group', group_id)]
+
+
+def profile_keys(request, username: str):
+    author_id = User.objects.filter(username=username).values_list(
+        'id', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    keys = [
+        caching.user_key(author_id),
+        caching.feed_key('author', author_id),
+    ]
+    if request.user.is_authenticated:
+        # Кнопка «Подписаться»/«Отписаться» зависит от подписок читателя.
+        keys.append(caching.feed_key('follow', request.user.pk))
+    return keys
+
+
+def detail_keys(request, post_id: int):
+    row = Post.objects.filter(id=post_id).values_list(
+        'author_id', 'group_id'
+    ).first()
+    if row is None:
+        return None
+    author_id, group_id = row
+    keys = [
+        caching.post_key(post_id),
+        caching.comments_key(post_id),
+        caching.user_key(author_id),
+        caching.feed_key('author', author_id),
+    ]
+    if group_id:
+        keys.append(caching.group_key(group_id))
+    return keys
+
+
+def comments_keys(request, post_id: int):
+    if not Post.objects.filter(id=post_id).exists():
+        return None
+    return [caching.comments_key(post_id)]
+
+
+def follow_keys(request) -> list:
+    return [caching.feed_key('follow', request.user.pk)]
+
+
+def _validators(request, keys_func, kwargs) -> tuple:
+    """Считает (etag, last_modified) один раз на запрос."""
+    if not hasattr(request, '_page_validators'):
+        request._page_validators = (None, None)
+        keys = keys_func(request, **kwargs)
+        if keys is not None:
+            keys.append(caching.CARDS_KEY)
+            if request.user.is_authenticated:
+                keys.append(caching.user_key(request.user.pk))
+            versions = caching.get_versions(keys)
+            parts = [str(versions[key]) for key in keys]
+            parts += [
+                str(request.user.pk),
+                request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+                request.GET.urlencode(),
+            ]
+            etag = hashlib.md5('|'.join(parts).encode()).hexdigest()
+            last_modified = datetime.fromtimestamp(
+                max(versions.values()) / 10 ** 9, tz=timezone.utc
+            )
+            request._page_validators = (etag, last_modified)
+    return request._page_validators
+
+
+def page(keys_func):
+    """Декоратор условного GET для представления.
+
+    keys_func(request, **kwargs) возвращает ключи версий, от которых
+    зависит страница, или None, если объекта нет: тогда проверка
+    пропускается, и представление само отвечает 404.
+    """
+    def etag(request, **kwargs):
+        return _validators(request, keys_func, kwargs)[0]
+
+    def last_modified(request, **kwargs):
+        return _validators(request, keys_func, kwargs)[1]
+
+    def decorator(view):
+        conditional_view = condition(etag, last_modified)(view)
+
+        @functools.wraps(view)
+        def wrapper(request, **kwargs):
+            response = conditional_view(request, **kwargs)
+            # Браузер не должен присылать валидаторы страницы, полученной
+            # до входа или выхода пользователя.
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
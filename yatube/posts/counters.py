@@ -0,0 +1,114 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарными F()-выражениями в обработчиках создания и
+удаления, поэтому страницы читают готовые числа без агрегатных запросов.
+Расхождения исправляет команда reconcile_counters.
+"""
+from django.db.models import Count, F
+
+from .models import Follow, Post, UserStats
+
+
+def _non_negative(deltas: dict) -> dict:
+    """Условия, не дающие счётчику уйти ниже нуля при уменьшении."""
+    return {
+        f'{field}__gte': -delta for field, delta in deltas.items() if delta < 0
+    }
+
+
+def _user_totals(user_id: int) -> dict:
+    return {
+        'posts_count': Post.objects.filter(author_id=user_id).count(),
+        'followers_count': Follow.objects.filter(author_id=user_id).count(),
+        'following_count': Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def reconcile_user(user_id: int) -> UserStats:
+    """Пересчитывает счётчики пользователя по данным таблиц."""
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id, defaults=_user_totals(user_id)
+    )
+    return stats
+
+
+def for_user(user) -> UserStats:
+    """Возвращает счётчики пользователя, создавая их при отсутствии."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return reconcile_user(user.pk)
+
+
+def change_user(user_id: int, create_missing: bool = True, **deltas) -> None:
+    """Атомарно изменяет счётчики пользователя на deltas.
+
+    При удалении (create_missing=False) отсутствующая строка не создаётся:
+    пользователь может удаляться каскадно вместе со своими счётчиками.
+    """
+    updated = UserStats.objects.filter(
+        user_id=user_id, **_non_negative(deltas)
+    ).update(**{field: F(field) + delta for field, delta in deltas.items()})
+    if not updated and create_missing:
+        reconcile_user(user_id)
+
+
+def change_users(user_ids, **deltas) -> None:
+    """Атомарно изменяет на deltas счётчики нескольких пользователей."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    updated = UserStats.objects.filter(
+        user_id__in=user_ids, **_non_negative(deltas)
+    ).update(**{field: F(field) + delta for field, delta in deltas.items()})
+    if updated < len(user_ids):
+        existing = UserStats.objects.filter(
+            user_id__in=user_ids
+        ).values_list('user_id', flat=True)
+        for user_id in user_ids.difference(existing):
+            reconcile_user(user_id)
+
+
+def change_comments(post_id: int, delta: int) -> None:
+    """Атомарно изменяет счётчик комментариев поста."""
+    Post.objects.filter(
+        id=post_id, **_non_negative({'comment_count': delta})
+    ).update(
+        comment_count=F('comment_count') + delta
+    )
+
+
+def reconcile() -> int:
+    """Исправляет расхождения всех счётчиков, возвращает их число."""
+    fixed = 0
+    drifted = Post.objects.annotate(
+        real_count=Count('comments')
+    ).exclude(comment_count=F('real_count')).values_list('id', 'real_count')
+    for post_id, real_count in drifted:
+        Post.objects.filter(id=post_id).update(comment_count=real_count)
+        fixed += 1
+    posts = dict(
+        Post.objects.order_by().values_list('author').annotate(Count('id'))
+    )
+    followers = dict(
+        Follow.objects.order_by().values_list('author').annotate(Count('id'))
+    )
+    following = dict(
+        Follow.objects.order_by().values_list('user').annotate(Count('id'))
+    )
+    existing = {stats.user_id: stats for stats in UserStats.objects.all()}
+    user_ids = set(existing) | set(posts) | set(followers) | set(following)
+    for user_id in user_ids:
+        totals = {
+            'posts_count': posts.get(user_id, 0),
+            'followers_count': followers.get(user_id, 0),
+            'following_count': following.get(user_id, 0),
+        }
+        stats = existing.get(user_id)
+        if stats is not None and all(
+            getattr(stats, field) == value for field, value in totals.items()
+        ):
+            continue
+        UserStats.objects.update_or_create(user_id=user_id, defaults=totals)
+        fixed += 1
+    return fixed
@@ -0,0 +1,164 @@
+"""Материализованная лента подписок.
+
+Для каждого подписчика хранится ограниченный список записей FeedEntry,
+который пополняется при публикации поста автором (fan-out on write),
+поэтому follow_index читает ленту одним проходом по индексу
+(user, pub_date) вместо соединения Follow и Post на каждый запрос.
+Если подписчиков больше FEED_FANOUT_SYNC_LIMIT, раскладка выполняется
+фоновой задачей, чтобы публикация поста не ждала записи во все ленты.
+"""
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import F
+
+from core import jobs
+
+from . import caching
+from .models import FeedEntry, Follow, Post
+
+
+def posts_for(user):
+    """Посты ленты подписок пользователя в порядке публикации.
+
+    Поля feed_date и feed_post берутся из той же строки FeedEntry,
+    поэтому фильтры курсора и сортировка идут по индексу ленты.
+    """
+    return Post.objects.feed().filter(feed_entries__user=user).annotate(
+        feed_date=F('feed_entries__pub_date'),
+        feed_post=F('feed_entries__post'),
+    ).order_by('-feed_date', '-feed_post')
+
+
+# Записи за пределами первых FEED_MAX_LENGTH в ленте каждого
+# пользователя; нумерация идёт по индексу (user, pub_date, post).
+TRIM_SQL = '''
+DELETE FROM {table} WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY user_id ORDER BY pub_date DESC, post_id DESC
+        ) AS position
+        FROM {table} WHERE user_id IN ({placeholders})
+    ) ranked WHERE position > %s
+)
+'''
+
+# Ограничение SQLite на число параметров запроса.
+TRIM_CHUNK_SIZE = 500
+
+
+def trim(*user_ids: int) -> None:
+    """Обрезает ленты пользователей до FEED_MAX_LENGTH записей.
+
+    Ленты всех пользователей обрезаются одним запросом DELETE (по
+    запросу на TRIM_CHUNK_SIZE пользователей), а не запросом на каждого.
+    """
+    connection = connections[router.db_for_write(FeedEntry)]
+    table = connection.ops.quote_name(FeedEntry._meta.db_table)
+    with connection.cursor() as cursor:
+        for start in range(0, len(user_ids), TRIM_CHUNK_SIZE):
+            chunk = user_ids[start:start + TRIM_CHUNK_SIZE]
+            cursor.execute(
+                TRIM_SQL.format(table=table,
+                                placeholders=', '.join(['%s'] * len(chunk))),
+                [*chunk, settings.FEED_MAX_LENGTH]
+            )
+
+
+def _push(post_id: int, pub_date, follower_ids: list) -> None:
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for user_id in follower_ids],
+        ignore_conflicts=True
+    )
+    trim(*follower_ids)
+
+
+def push_post(post: Post) -> None:
+    """Добавляет новый пост в ленты всех подписчиков автора."""
+    follower_ids = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+    )
+    if len(follower_ids) > settings.FEED_FANOUT_SYNC_LIMIT:
+        jobs.enqueue(fan_out, dedupe_key=f'feed-fan-out:{post.pk}',
+                     post_id=post.pk)
+        return
+    _push(post.pk, post.pub_date, follower_ids)
+
+
+@jobs.task
+def fan_out(post_id: int) -> None:
+    """Раскладывает пост по лентам подписчиков в фоне."""
+    post = Post.objects.filter(id=post_id).only(
+        'author_id', 'pub_date'
+    ).first()
+    if post is None:
+        return
+    follower_ids = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+    )
+    _push(post.pk, post.pub_date, follower_ids)
+    caching.bump(*(caching.feed_key('follow', user_id)
+                   for user_id in follower_ids))
+
+
+def bump_post(post: Post) -> None:
+    """Меняет версии поста и всех лент, в которых он выводится."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    caching.bump(
+        caching.post_key(post.pk),
+        *caching.post_feed_keys(post),
+        *(caching.feed_key('follow', user_id) for user_id in followers)
+    )
+
+
+def bump_post_id(post_id: int) -> None:
+    """bump_post для поста, изменённого без сигналов (update(), задачи)."""
+    post = Post.objects.filter(id=post_id).only('author_id', 'group_id')
+    post = post.first()
+    if post is None:
+        caching.bump(caching.post_key(post_id))
+    else:
+        bump_post(post)
+
+
+def update_post(post: Post) -> None:
+    """Переносит дату публикации отредактированного поста в ленты."""
+    FeedEntry.objects.filter(post=post).update(pub_date=post.pub_date)
+
+
+def backfill(user_id: int, *author_ids: int) -> None:
+    """Добавляет в ленту последние посты авторов после подписки."""
+    posts = Post.objects.filter(author_id__in=author_ids).values_list(
+        'id', 'pub_date'
+    )[:settings.FEED_MAX_LENGTH]
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts],
+        ignore_conflicts=True
+    )
+    trim(user_id)
+
+
+def remove_author(user_id: int, *author_ids: int) -> None:
+    """Убирает из ленты посты авторов после отписки."""
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id__in=author_ids
+    ).delete()
+
+
+def rebuild(user_id: int) -> int:
+    """Полностью пересобирает ленту пользователя по его подпискам."""
+    FeedEntry.objects.filter(user_id=user_id).delete()
+    posts = Post.objects.filter(
+        author__following__user_id=user_id
+    ).values_list('id', 'pub_date')[:settings.FEED_MAX_LENGTH]
+    entries = FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts],
+        ignore_conflicts=True
+    )
+    return len(entries)
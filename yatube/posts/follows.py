@@ -0,0 +1,78 @@
+"""Массовая подписка и отписка, например при онбординге.
+
+Подписки вставляются одним INSERT с пропуском уже существующих пар
+(уникальное ограничение unique_follow) и удаляются одним DELETE. Ни то,
+ни другое не отправляет сигналы, поэтому счётчики, ленты и версии
+страниц обновляются здесь же пакетно. Пару, вставленную параллельным
+запросом между проверкой и вставкой, исправит reconcile_counters.
+"""
+from django.db import transaction
+
+from core.sqlite import retry_locked
+
+from . import caching, counters, feed
+from .models import Follow, User
+
+
+@retry_locked
+@transaction.atomic
+def follow_many(user, author_ids) -> int:
+    """Подписывает пользователя на авторов, возвращает число новых подписок.
+
+    Несуществующие авторы и сам пользователь пропускаются.
+    """
+    author_ids = set(
+        User.objects.filter(id__in=set(author_ids)).exclude(
+            id=user.pk
+        ).values_list('id', flat=True)
+    )
+    author_ids.difference_update(
+        Follow.objects.filter(
+            user=user, author_id__in=author_ids
+        ).values_list('author_id', flat=True)
+    )
+    if not author_ids:
+        return 0
+    Follow.objects.bulk_create(
+        [Follow(user=user, author_id=author_id) for author_id in author_ids],
+        ignore_conflicts=True
+    )
+    counters.change_user(user.pk, following_count=len(author_ids))
+    counters.change_users(author_ids, followers_count=1)
+    feed.backfill(user.pk, *author_ids)
+    caching.bump(
+        caching.feed_key('follow', user.pk),
+        caching.feed_key('author', user.pk),
+        *(caching.feed_key('author', author_id) for author_id in author_ids)
+    )
+    return len(author_ids)
+
+
+@retry_locked
+@transaction.atomic
+def unfollow_many(user, author_ids) -> int:
+    """Отписывает пользователя от авторов, возвращает число отписок.
+
+    Подписки удаляются одним DELETE без обработчиков post_delete,
+    поэтому счётчики, ленты и версии страниц обновляются здесь же.
+    """
+    follows = Follow.objects.filter(user=user, author_id__in=set(author_ids))
+    author_ids = set(follows.values_list('author_id', flat=True))
+    if not author_ids:
+        return 0
+    # QuerySet.delete() при подписанных обработчиках загружает строки
+    # и удаляет их по одной, отправляя сигналы для каждой.
+    Follow.objects.filter(
+        user=user, author_id__in=author_ids
+    )._raw_delete(follows.db)
+    counters.change_user(
+        user.pk, create_missing=False, following_count=-len(author_ids)
+    )
+    counters.change_users(author_ids, followers_count=-1)
+    feed.remove_author(user.pk, *author_ids)
+    caching.bump(
+        caching.feed_key('follow', user.pk),
+        caching.feed_key('author', user.pk),
+        *(caching.feed_key('author', author_id) for author_id in author_ids)
+    )
+    return len(author_ids)
@@ -12,6 +12,13 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def save(self, commit=True):
+        if 'image' in self.changed_data:
+            # Новое изображение будет нормализовано после сохранения.
+            self.instance.image_width = None
+            self.instance.image_height = None
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
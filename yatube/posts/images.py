@@ -0,0 +1,113 @@
+"""Нормализация загруженных изображений постов.
+
+После сохранения поста задача в очереди core.jobs уменьшает оригинал до
+POST_IMAGE_MAX_SIZE, очищается от метаданных и перекодируется (JPEG, а
+при прозрачности — PNG). Пост получает новый файл в NORMALIZED_DIR со
+случайной частью имени и размеры, а затем для него сразу создаётся
+миниатюра. Такие имена не переиспользуются, и core.media разрешает
+браузерам кэшировать их навсегда. Для обработки, занимающей процессор,
+обработчик очереди стоит запускать с ключом --processes.
+"""
+import os
+import secrets
+import shutil
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from core import jobs
+
+from . import feed, thumbnails
+
+NORMALIZED_DIR = 'posts/normalized'
+
+
+def _target(path: str, directory: str, extension: str) -> str:
+    """Новое имя файла в directory: оригинал не перезаписывается, так как
+    его могут в этот момент отдавать клиентам."""
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(directory,
+                        f'{base}_{secrets.token_hex(4)}{extension}')
+
+
+def normalize_file(path: str, directory: str, max_size: tuple,
+                   quality: int) -> tuple:
+    """Перекодирует файл изображения в новый файл в directory,
+    возвращает (путь, ширина, высота).
+
+    Анимированные изображения не перекодируются, а копируются.
+    """
+    with Image.open(path) as source:
+        if getattr(source, 'is_animated', False):
+            target = _target(path, directory, os.path.splitext(path)[1])
+            shutil.copyfile(path, target)
+            return target, source.width, source.height
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail(max_size, Image.LANCZOS)
+        has_alpha = image.mode in ('RGBA', 'LA') or (
+            image.mode == 'P' and 'transparency' in image.info
+        )
+        if has_alpha:
+            image = image.convert('RGBA')
+            extension, save_options = '.png', {'optimize': True}
+        else:
+            image = image.convert('RGB')
+            extension, save_options = '.jpg', {
+                'quality': quality, 'optimize': True, 'progressive': True
+            }
+        target = _target(path, directory, extension)
+        image.save(target, **save_options)
+        return target, image.width, image.height
+
+
+def _apply(post_id: int, name: str, result: tuple) -> None:
+    """Записывает результат нормализации в пост.
+
+    Прежний файл удаляется только после того, как для нового создана
+    миниатюра; иначе он остаётся в хранилище.
+    """
+    from .models import Post
+
+    path, width, height = result
+    new_name = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, '/')
+    updated = Post.objects.filter(id=post_id, image=name).update(
+        image=new_name, image_width=width, image_height=height
+    )
+    if not updated:
+        default_storage.delete(new_name)
+        return
+    # update() не посылает сигналов: версии поста и лент с ним меняем
+    # сами, до удаления прежнего файла, на который ссылались карточки.
+    feed.bump_post_id(post_id)
+    if thumbnails.generate(post_id, new_name):
+        default_storage.delete(name)
+
+
+@jobs.task
+def process(post_id: int, name: str) -> None:
+    """Нормализует изображение поста; файл могли уже удалить или заменить."""
+    if not thumbnails.source_exists(name):
+        return
+    _apply(post_id, name, normalize_file(
+        default_storage.path(name),
+        default_storage.path(NORMALIZED_DIR),
+        settings.POST_IMAGE_MAX_SIZE,
+        settings.POST_IMAGE_QUALITY,
+    ))
+
+
+def schedule(post) -> bool:
+    """Ставит в очередь нормализацию ещё не обработанного изображения.
+
+    Возвращает True, если обработка запланирована: миниатюра тогда
+    создаётся после неё.
+    """
+    if not post.image or post.image_width:
+        return False
+    jobs.enqueue(
+        process, dedupe_key=f'post-image:{post.pk}:{post.image.name}',
+        post_id=post.pk, name=post.image.name,
+    )
+    return True
@@ -0,0 +1,41 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db import connections
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def _generate(item):
+    return thumbnails.generate(*item)
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие миниатюры изображений постов в пуле процессов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Число процессов (по умолчанию — число ядер).'
+        )
+        parser.add_argument(
+            '--chunksize', type=int, default=16,
+            help='Сколько изображений передавать процессу за раз.'
+        )
+
+    def handle(self, *args, **options):
+        items = list(
+            Post.objects.exclude(image='').values_list('id', 'image')
+        )
+        connections.close_all()
+        created = 0
+        with ProcessPoolExecutor(max_workers=options['workers'],
+                                 initializer=django.setup) as pool:
+            for done in pool.map(_generate, items,
+                                 chunksize=options['chunksize']):
+                created += done
+        self.stdout.write(
+            f'Обработано изображений: {len(items)}, готово миниатюр: {created}'
+        )
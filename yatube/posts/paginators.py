@@ -0,0 +1,191 @@
+"""Пагинация лент: постраничная и курсорная (keyset).
+
+FeedPaginator — постраничный Paginator, который берёт число постов ленты
+из кэша и показывает ссылки только на страницы вокруг текущей.
+
+Курсорная пагинация не выполняет COUNT(*) и не использует OFFSET:
+страница выбирается условием по паре (дата, id) относительно курсора,
+поэтому стоимость запроса не зависит от глубины страницы, а посты с
+одинаковой датой не дублируются и не теряются между страницами.
+"""
+import base64
+import binascii
+import time
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from . import caching
+
+
+def encode_cursor(date, pk) -> str:
+    """Упаковывает пару (дата, id) в токен для URL."""
+    raw = f'{date.isoformat()}_{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token: str):
+    """Распаковывает токен курсора; для некорректного токена — None."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        date, pk = raw.decode().rsplit('_', 1)
+        date = parse_datetime(date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if date is None:
+        return None
+    return date, pk
+
+
+class FeedPaginator(Paginator):
+    """Paginator с кэшированным числом объектов.
+
+    count_key — ключ версии ленты из posts.caching: число объектов
+    хранится в кэше вместе с версией и пересчитывается, только когда
+    лента изменилась. Если объектов больше PAGINATOR_EXACT_COUNT, прежнее
+    число используется как оценка (approximate = True) ещё
+    PAGINATOR_ESTIMATE_TIMEOUT секунд после изменения ленты: для номера
+    последней страницы большой ленты COUNT(*) на каждый новый пост
+    не нужен.
+    """
+
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, count_key: str = None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.approximate = False
+
+    @cached_property
+    def count(self) -> int:
+        if self.count_key is None:
+            return super().count
+        cache_key = f'count:{self.count_key}'
+        found = cache.get_many([self.count_key, cache_key])
+        version = found.get(self.count_key)
+        if version is None:
+            version = caching.get_versions([self.count_key])[self.count_key]
+        cached = found.get(cache_key)
+        if cached is not None:
+            counted_version, count, counted_at = cached
+            if counted_version == version:
+                return count
+            if (count > settings.PAGINATOR_EXACT_COUNT
+                    and time.time() - counted_at
+                    < settings.PAGINATOR_ESTIMATE_TIMEOUT):
+                self.approximate = True
+                return count
+        count = super().count
+        cache.set(cache_key, (version, count, time.time()), None)
+        return count
+
+    def get_elided_page_range(self, number=1, on_each_side=3, on_ends=2):
+        """Номера страниц вокруг текущей и по краям, пропуски — ELLIPSIS.
+
+        Повторяет одноимённый метод Paginator из Django 3.2.
+        """
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > (1 + on_each_side + on_ends) + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < (self.num_pages - on_each_side - on_ends) - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1,
+                             self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+
+class CursorPage(Page):
+    """Страница курсорной пагинации, совместимая с Page."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} objects>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return ''
+        return self.paginator.cursor_for(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return ''
+        return self.paginator.cursor_for(self.object_list[0])
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по убыванию пары (дата, id).
+
+    keys — имена атрибутов объекта, из которых строится курсор,
+    lookups — соответствующие им поля для фильтрации и сортировки
+    (по умолчанию совпадают с keys).
+    """
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'id'),
+                 lookups=None):
+        super().__init__(object_list, per_page)
+        self.keys = keys
+        self.lookups = lookups or keys
+
+    def cursor_for(self, obj) -> str:
+        if isinstance(obj, Mapping):
+            values = [obj[key] for key in self.keys]
+        else:
+            values = [getattr(obj, key) for key in self.keys]
+        return encode_cursor(*values)
+
+    def get_cursor_page(self, after=None, before=None) -> CursorPage:
+        date_lookup, pk_lookup = self.lookups
+        queryset = self.object_list
+        if before is not None:
+            date, pk = before
+            queryset = queryset.filter(
+                Q(**{f'{date_lookup}__gt': date})
+                | Q(**{date_lookup: date, f'{pk_lookup}__gt': pk})
+            ).order_by(date_lookup, pk_lookup)
+            rows = list(queryset[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return CursorPage(rows, self, True, has_previous)
+        if after is not None:
+            date, pk = after
+            queryset = queryset.filter(
+                Q(**{f'{date_lookup}__lt': date})
+                | Q(**{date_lookup: date, f'{pk_lookup}__lt': pk})
+            )
+        queryset = queryset.order_by(f'-{date_lookup}', f'-{pk_lookup}')
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return CursorPage(rows[:self.per_page], self, has_next,
+                          after is not None)
@@ -0,0 +1,125 @@
+from django.db import connections
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import caching, counters, feed, images, search, thumbnails
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    """Раскладывает новый пост по лентам подписчиков
+    и ставит в очередь обработку изображения."""
+    if raw:
+        return
+    if created:
+        counters.change_user(instance.author_id, posts_count=1)
+        feed.push_post(instance)
+    else:
+        feed.update_post(instance)
+    if not images.schedule(instance):
+        thumbnails.schedule(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    """Уменьшает счётчик постов автора."""
+    counters.change_user(
+        instance.author_id, create_missing=False, posts_count=-1
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    """Дополняет ленту постами автора после подписки."""
+    if created and not raw:
+        counters.change_user(instance.user_id, following_count=1)
+        counters.change_user(instance.author_id, followers_count=1)
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """Убирает посты автора из ленты после отписки."""
+    counters.change_user(
+        instance.user_id, create_missing=False, following_count=-1
+    )
+    counters.change_user(
+        instance.author_id, create_missing=False, followers_count=-1
+    )
+    feed.remove_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    """Увеличивает счётчик комментариев поста."""
+    if created and not raw:
+        counters.change_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """Уменьшает счётчик комментариев поста."""
+    counters.change_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    """Сбрасывает кэшированную карточку поста и версии лент с ним."""
+    feed.bump_post(instance)
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comments_changed(sender, instance, **kwargs):
+    """Меняет версию комментариев поста."""
+    caching.bump(caching.comments_key(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follows_changed(sender, instance, **kwargs):
+    """Меняет версии ленты подписок и профилей обоих пользователей."""
+    caching.bump(
+        caching.feed_key('follow', instance.user_id),
+        caching.feed_key('author', instance.user_id),
+        caching.feed_key('author', instance.author_id),
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    """Сбрасывает карточки постов группы."""
+    caching.bump(caching.group_key(instance.pk), caching.CARDS_KEY)
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    """Заводит счётчики для нового пользователя."""
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, created=False, update_fields=None,
+                 **kwargs):
+    """Сбрасывает карточки постов автора.
+
+    Новый пользователь и обновление одного last_login при входе
+    на карточки не влияют.
+    """
+    if created or update_fields and set(update_fields) == {'last_login'}:
+        return
+    caching.bump(caching.user_key(instance.pk), caching.CARDS_KEY)
+
+
+def search_installed(sender, using, **kwargs):
+    """Восстанавливает триггеры поиска после миграций.
+
+    Подключается в PostsConfig.ready к сигналу post_migrate.
+    """
+    search.install(connections[using])
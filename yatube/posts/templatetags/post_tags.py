@@ -0,0 +1,83 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.fields.files import ImageFieldFile
+from django.utils.safestring import mark_safe
+
+from posts import thumbnails
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+CARD_TIMEOUT = 60 * 60 * 24
+
+
+@register.simple_tag
+def post_image_url(image: ImageFieldFile) -> str:
+    """URL готовой миниатюры, а пока её нет — оригинала изображения."""
+    thumbnail = thumbnails.cached(image)
+    if thumbnail is None:
+        return image.url
+    return thumbnail.url
+
+
+@register.simple_tag(takes_context=True)
+def query_with(context, **params) -> str:
+    """Строка запроса текущей страницы с другими параметрами пагинации.
+
+    Остальные параметры (например, поисковый запрос) сохраняются.
+    """
+    query = context['request'].GET.copy()
+    for key in ('page', 'after', 'before'):
+        query.pop(key, None)
+    for key, value in params.items():
+        query[key] = value
+    return f'?{query.urlencode()}'
+
+
+@register.simple_tag
+def page_window(page_obj) -> list:
+    """Номера страниц вокруг текущей, пропуски — paginator.ELLIPSIS."""
+    return list(page_obj.paginator.get_elided_page_range(
+        page_obj.number, on_each_side=settings.PAGINATOR_WINDOW, on_ends=1
+    ))
+
+
+def _card_key(post, show_group: bool) -> str:
+    return f'post_card:{post.pk}:{post.card_version}:{int(show_group)}'
+
+
+def _page_cards(context, show_group: bool) -> dict:
+    """Готовые карточки всех постов страницы одним запросом к кэшу."""
+    state_key = ('post_cards', show_group)
+    cards = context.render_context.get(state_key)
+    if cards is None:
+        keys = [
+            _card_key(post, show_group)
+            for post in context.get('page_obj') or ()
+            if hasattr(post, 'card_version')
+        ]
+        cards = cache.get_many(keys) if keys else {}
+        context.render_context[state_key] = cards
+    return cards
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post, show_group: bool = True) -> str:
+    """Карточка поста для лент.
+
+    Готовый HTML кэшируется по версии поста, автора и группы
+    (post.card_version, см. caching.attach_card_versions); для постов
+    без версии карточка рендерится без кэша.
+    """
+    versioned = hasattr(post, 'card_version')
+    if versioned:
+        key = _card_key(post, show_group)
+        html = _page_cards(context, show_group).get(key)
+        if html is not None:
+            return mark_safe(html)
+    card = context.template.engine.get_template(CARD_TEMPLATE)
+    html = card.render(context.new({'post': post, 'show_group': show_group}))
+    if versioned:
+        cache.set(key, html, CARD_TIMEOUT)
+    return mark_safe(html)
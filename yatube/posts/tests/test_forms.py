@@ -1,12 +1,19 @@
 import shutil
 import tempfile
+from io import BytesIO
+from unittest import mock
+
+from PIL import Image
 
 from django.test import Client, TestCase, override_settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.conf import settings
 
+from posts import images, thumbnails
 from posts.forms import Post
 from posts.models import Group, User, Comment
 
@@ -84,6 +91,76 @@ class PostCreateFormTests(TestCase):
             ).exists()
         )
 
+    @override_settings(POST_IMAGE_MAX_SIZE=(100, 100))
+    def test_uploaded_image_is_normalized(self):
+        """Загруженное изображение уменьшается и перекодируется в JPEG."""
+        buffer = BytesIO()
+        Image.new('RGB', (400, 200), color=(255, 0, 0)).save(buffer, 'PNG')
+        uploaded = SimpleUploadedFile(
+            name='big.png',
+            content=buffer.getvalue(),
+            content_type='image/png'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Большая картинка', 'image': uploaded},
+        )
+        post = Post.objects.get(text='Большая картинка')
+        self.assertIsNone(post.image_width)
+        original = post.image.name
+        index = self.guest_user.get(reverse('posts:index'))
+        self.assertContains(index, original)
+        images.process(post.id, original)
+        post.refresh_from_db()
+        self.assertTrue(post.image.name.startswith('posts/normalized/'))
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        self.assertFalse(default_storage.exists(original))
+        index = self.guest_user.get(reverse('posts:index'),
+                                    HTTP_IF_NONE_MATCH=index['ETag'])
+        self.assertEqual(index.status_code, 200)
+        self.assertNotContains(index, original)
+        self.assertEqual((post.image_width, post.image_height), (100, 50))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (100, 50))
+
+    def test_normalized_jpeg_written_to_new_file(self):
+        """JPEG не перезаписывается на месте, а сохраняется в новый файл."""
+        buffer = BytesIO()
+        Image.new('RGB', (400, 200)).save(buffer, 'JPEG')
+        name = default_storage.save('posts/photo.jpg',
+                                    ContentFile(buffer.getvalue()))
+        post = Post.objects.create(author=self.user, text='Фото', image=name)
+        with mock.patch.object(thumbnails, 'generate', return_value=False):
+            images.process(post.id, name)
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, name)
+        self.assertEqual(post.image_width, 400)
+        with default_storage.open(name) as original:
+            self.assertEqual(original.read(), buffer.getvalue())
+
+    def test_create_post_rolled_back_with_jobs(self):
+        """Пост не сохраняется, если не удалось поставить его задачи."""
+        posts_count = Post.objects.count()
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        with mock.patch('core.jobs.enqueue', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.authorized_client.post(
+                    reverse('posts:post_create'),
+                    data={'text': 'Текст', 'image': SimpleUploadedFile(
+                        name='rollback.gif', content=small_gif,
+                        content_type='image/gif',
+                    )},
+                )
+        self.assertEqual(Post.objects.count(), posts_count)
+
     def test_post_edit(self):
         """При отправке валидной формы со страницы редактирования
         поста происходит изменение поста."""
@@ -1,7 +1,15 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
-from posts.models import Post, Group, User, Comment
+from core.models import Job
+from posts import feed, follows
+from posts.models import (Post, Group, User, Comment, Follow, UserStats,
+                          FeedEntry)
 
 User = get_user_model()
 
@@ -45,3 +53,130 @@ class YatubeModelTest(TestCase):
         comment = self.comment
         expected_object_name = comment.text[:15]
         self.assertEqual(expected_object_name, str(comment))
+
+
+class CountersTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def test_counters_follow_create_and_delete(self):
+        """Счётчики меняются при создании и удалении объектов."""
+        Post.objects.create(author=self.author, text='Второй пост')
+        comment = Comment.objects.create(
+            post=self.post, author=self.follower, text='Комментарий')
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        self.post.refresh_from_db()
+        author_stats = UserStats.objects.get(user=self.author)
+        follower_stats = UserStats.objects.get(user=self.follower)
+        self.assertEqual(author_stats.posts_count, 2)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(follower_stats.following_count, 1)
+        self.assertEqual(self.post.comment_count, 1)
+        comment.delete()
+        follow.delete()
+        self.post.refresh_from_db()
+        author_stats.refresh_from_db()
+        self.assertEqual(author_stats.followers_count, 0)
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_reconcile_counters(self):
+        """Команда reconcile_counters исправляет расхождения."""
+        UserStats.objects.filter(user=self.author).update(posts_count=42)
+        Post.objects.filter(id=self.post.id).update(comment_count=7)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 1)
+
+
+class FollowTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(3)
+        ]
+        for author in cls.authors:
+            Post.objects.create(author=author, text=f'Пост {author}')
+
+    def test_follow_is_unique(self):
+        Follow.objects.create(user=self.user, author=self.authors[0])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.user, author=self.authors[0])
+
+    def test_follow_many(self):
+        """Массовая подписка пропускает дубли, себя и чужие id."""
+        Follow.objects.create(user=self.user, author=self.authors[0])
+        author_ids = [author.id for author in self.authors]
+        created = follows.follow_many(
+            self.user, author_ids + [self.user.id, 0]
+        )
+        self.assertEqual(created, 2)
+        self.assertEqual(
+            Follow.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).following_count, 3)
+        self.assertEqual(
+            UserStats.objects.get(user=self.authors[2]).followers_count, 1)
+        self.assertEqual(follows.follow_many(self.user, author_ids), 0)
+
+    def test_unfollow_many(self):
+        author_ids = [author.id for author in self.authors]
+        follows.follow_many(self.user, author_ids)
+        self.assertEqual(follows.unfollow_many(self.user, author_ids[:2]), 2)
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).following_count, 1)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.authors[0]).followers_count, 0)
+
+    def test_unfollow_many_query_count(self):
+        """Число запросов не зависит от числа отписок."""
+        author_ids = [author.id for author in self.authors]
+        follows.follow_many(self.user, author_ids)
+        with CaptureQueriesContext(connection) as one:
+            follows.unfollow_many(self.user, author_ids[:1])
+        with CaptureQueriesContext(connection) as two:
+            follows.unfollow_many(self.user, author_ids[1:])
+        self.assertEqual(len(one), len(two))
+
+    @override_settings(FEED_MAX_LENGTH=1)
+    def test_push_post_trims_in_one_query(self):
+        """Раскладка не делает запросов на каждого подписчика."""
+        readers = [self.user] + [
+            User.objects.create_user(username=f'reader{i}') for i in range(4)
+        ]
+        for reader in readers:
+            Follow.objects.create(user=reader, author=self.authors[0])
+        post = Post.objects.create(author=self.authors[0], text='Новый')
+        FeedEntry.objects.filter(post=post).delete()
+        # Подписчики, вставка записей и обрезка лент.
+        with self.assertNumQueries(3):
+            feed.push_post(post)
+        for reader in readers:
+            self.assertEqual(
+                list(FeedEntry.objects.filter(user=reader)
+                     .values_list('post_id', flat=True)), [post.id])
+
+    @override_settings(FEED_FANOUT_SYNC_LIMIT=0)
+    def test_fan_out_in_background(self):
+        """Пост автора с подписчиками раскладывается по лентам задачей."""
+        Follow.objects.create(user=self.user, author=self.authors[0])
+        post = Post.objects.create(author=self.authors[0], text='Новый')
+        self.assertFalse(
+            FeedEntry.objects.filter(user=self.user, post=post).exists())
+        self.assertTrue(Job.objects.filter(name__endswith='fan_out').exists())
+        call_command('runworker', once=True, workers=1, stdout=StringIO())
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.user, post=post).exists())
@@ -0,0 +1,133 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin, QueryPlanMixin
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class PostQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Бюджеты SQL-запросов страниц posts."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='reader', first_name='Имя', last_name='Фамилия')
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(12):
+            post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}')
+        for i in range(5):
+            Comment.objects.create(
+                post=post, author=cls.user, text=f'Комментарий {i}')
+        cls.post = post
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_guest_query_budgets(self):
+        """Страницы для гостя укладываются в бюджет запросов.
+
+        Группа, профиль и пост тратят один запрос на валидаторы условного
+        GET (posts.conditional).
+        """
+        budgets = {
+            reverse('posts:index'): 2,
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}): 4,
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}): 4,
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.post.id}): 3,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                self.assertQueryBudget(self.guest_client, url, budget)
+
+    def test_authorized_query_budgets(self):
+        """Страницы для пользователя укладываются в бюджет запросов."""
+        budgets = {
+            reverse('posts:index'): 4,
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}): 6,
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}): 7,
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.post.id}): 5,
+            reverse('posts:follow_index'): 4,
+            reverse('posts:post_create'): 3,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                self.assertQueryBudget(self.authorized_client, url, budget)
+
+    def test_cached_page_count(self):
+        """Число постов ленты берётся из кэша, пока лента не изменилась."""
+        url = reverse('posts:index')
+        cache.clear()
+        self.guest_client.get(url)
+        with self.assertNumQueries(1):
+            self.guest_client.get(url + '?page=2')
+
+    def test_author_query_budgets(self):
+        """Страница редактирования укладывается в бюджет запросов."""
+        author_client = Client()
+        author_client.force_login(self.author)
+        url = reverse('posts:post_edit', kwargs={'post_id': self.post.id})
+        self.assertQueryBudget(author_client, url, 4)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN есть в SQLite')
+class PostQueryPlanTest(QueryPlanMixin, TestCase):
+    """Запросы лент идут по индексам без полного просмотра и сортировки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(3):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}')
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {i}')
+
+    def test_feed_query_plans(self):
+        client = Client()
+        client.force_login(self.user)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:index') + '?after=',
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:comments', kwargs={'post_id': self.post.id}),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertIndexedPlans(client, url)
+
+    def test_edit_query_plan(self):
+        """Страница редактирования выбирает пост по плану post_detail."""
+        client = Client()
+        client.force_login(self.author)
+        # Список групп для выбора в форме читается целиком.
+        self.scan_allowed = self.scan_allowed + ('posts_group',)
+        self.assertIndexedPlans(client, reverse(
+            'posts:post_edit', kwargs={'post_id': self.post.id}))
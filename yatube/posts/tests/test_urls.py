@@ -41,7 +41,8 @@ class PostURLTests(TestCase):
             reverse('posts:index'),
             reverse('posts:group_list', kwargs={'slug': self.group.slug}),
             reverse('posts:profile', kwargs={'username': self.user.username}),
-            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:comments', kwargs={'post_id': self.post.id}),
         ]
         for reverse_name in reverse_names:
             with self.subTest(reverse_name=reverse_name):
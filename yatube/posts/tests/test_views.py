@@ -1,5 +1,7 @@
 import tempfile
 import shutil
+from io import StringIO
+from unittest import mock
 
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase, override_settings
@@ -8,8 +10,11 @@ from django import forms
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.core.management import call_command
 
-from posts.models import Post, Group, Follow
+from posts import thumbnails
+from posts.templatetags import post_tags
+from posts.models import Post, Group, Follow, FeedEntry, Comment
 
 User = get_user_model()
 
@@ -165,21 +170,71 @@ class PostViewsTests(TestCase):
         self.assertIsNot(self.post, response.context['page_obj'])
 
     def test_cache(self):
-        """Проверка работы кеша."""
+        """Карточка поста кэшируется и сбрасывается при его изменении."""
         post_1 = Post.objects.create(
             text='Кэш текст',
             author=self.user,
             group=self.group,)
         page_index = self.authorized_client.get(
-            reverse('posts:index')).content
+            reverse('posts:index')).content.decode()
+        self.assertIn('Кэш текст', page_index)
+        Post.objects.filter(id=post_1.id).update(text='Без сигнала')
+        page_cached = self.authorized_client.get(
+            reverse('posts:index')).content.decode()
+        self.assertIn('Кэш текст', page_cached)
+        post_1.text = 'Новый текст'
+        post_1.save()
+        page_edit = self.authorized_client.get(
+            reverse('posts:index')).content.decode()
+        self.assertIn('Новый текст', page_edit)
         post_1.delete()
         page_delete = self.authorized_client.get(
-            reverse('posts:index')).content
-        self.assertEqual(page_index, page_delete)
-        cache.clear()
-        page_cache_clear = self.authorized_client.get(
-            reverse('posts:index')).content
-        self.assertNotEqual(page_index, page_cache_clear)
+            reverse('posts:index')).content.decode()
+        self.assertNotIn('Новый текст', page_delete)
+
+    def test_thumbnail_fallback_to_original(self):
+        """Пока миниатюра не готова, выводится оригинал изображения."""
+        content = self.guest_client.get(reverse('posts:index')).content
+        self.assertIn(self.post.image.url.encode(), content)
+        self.assertTrue(
+            thumbnails.generate(self.post.id, self.post.image.name))
+        thumbnail = thumbnails.cached(self.post.image)
+        content = self.guest_client.get(reverse('posts:index')).content
+        self.assertIn(thumbnail.url.encode(), content)
+
+    def test_cache_shared_between_feeds(self):
+        """Смена группы сбрасывает карточки её постов."""
+        response = self.authorized_client.get(reverse(
+            'posts:profile', kwargs={'username': self.user.username}))
+        self.assertIn(self.group.title, response.content.decode())
+        self.group.title = 'Новый заголовок'
+        self.group.save()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertIn('Новый заголовок', response.content.decode())
+
+    def test_post_card_tag_batches_cache_reads(self):
+        """Карточки страницы читаются из кэша одним get_many."""
+        for i in range(3):
+            Post.objects.create(text=f'Пост {i}', author=self.user)
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        with mock.patch.object(post_tags.cache, 'get_many',
+                               wraps=post_tags.cache.get_many) as get_many:
+            response = self.guest_client.get(url)
+        card_calls = [call for call in get_many.call_args_list
+                      if str(call[0][0][0]).startswith('post_card:')]
+        self.assertEqual(len(card_calls), 1)
+        self.assertEqual(len(card_calls[0][0][0]), 4)
+        self.assertContains(response, 'Пост 2')
+
+    def test_post_card_cached_per_layout(self):
+        """Карточки с группой и без неё кэшируются отдельно."""
+        self.guest_client.get(reverse('posts:index'))
+        response = self.guest_client.get(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}))
+        self.assertNotContains(response, 'Группа:')
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Группа:')
 
 
 class PaginatorViewsTest(TestCase):
@@ -216,6 +271,90 @@ class PaginatorViewsTest(TestCase):
                 response = self.guest_client.get(url + '?page=2')
                 self.assertEqual(len(response.context['page_obj']), 3)
 
+    def test_cursor_paginator(self):
+        """Курсорная пагинация проходит ленту вперёд и назад."""
+        url = reverse('posts:index')
+        response = self.guest_client.get(url + '?after=')
+        first_page = list(response.context['page_obj'])
+        self.assertEqual(len(first_page), 10)
+        next_cursor = response.context['page_obj'].next_cursor
+        response = self.guest_client.get(url + f'?after={next_cursor}')
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 3)
+        self.assertFalse(page_obj.has_next())
+        response = self.guest_client.get(
+            url + f'?before={page_obj.previous_cursor}')
+        self.assertEqual(list(response.context['page_obj']), first_page)
+
+    def test_cursor_paginator_same_pub_date(self):
+        """Посты с одинаковой датой не теряются между страницами."""
+        Post.objects.update(pub_date=Post.objects.first().pub_date)
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        response = self.guest_client.get(url + '?after=')
+        seen = list(response.context['page_obj'])
+        next_cursor = response.context['page_obj'].next_cursor
+        response = self.guest_client.get(url + f'?after={next_cursor}')
+        seen += list(response.context['page_obj'])
+        self.assertEqual(len(set(seen)), Post.objects.count())
+
+    @override_settings(PAGE=1, PAGINATOR_WINDOW=2)
+    def test_paginator_window(self):
+        """Пагинатор выводит только страницы вокруг текущей."""
+        response = self.guest_client.get(
+            reverse('posts:index') + '?page=7')
+        for page in (1, 5, 6, 8, 9, 13):
+            self.assertContains(response, f'href="?page={page}"')
+        for page in (2, 3, 4, 10, 11, 12):
+            self.assertNotContains(response, f'href="?page={page}"')
+        self.assertContains(response, '…', count=2)
+
+    def test_page_count_invalidated(self):
+        """Новый пост сбрасывает кэшированное число постов ленты."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        response = self.guest_client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 13)
+        Post.objects.create(author=self.user, group=self.group, text='Ещё')
+        response = self.guest_client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 14)
+
+    @override_settings(PAGINATOR_EXACT_COUNT=10)
+    def test_approximate_page_count(self):
+        """Большая лента какое-то время использует прежнее число постов."""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        Post.objects.create(author=self.user, text='Ещё')
+        paginator = self.guest_client.get(url).context['page_obj'].paginator
+        self.assertEqual(paginator.count, 13)
+        self.assertTrue(paginator.approximate)
+        with self.settings(PAGINATOR_ESTIMATE_TIMEOUT=0):
+            paginator = self.guest_client.get(
+                url).context['page_obj'].paginator
+        self.assertEqual(paginator.count, 14)
+        self.assertFalse(paginator.approximate)
+
+    @override_settings(COMMENTS_PAGE=3)
+    def test_comments_paginator(self):
+        """Комментарии выводятся постранично и подгружаются по курсору."""
+        post = Post.objects.first()
+        for i in range(5):
+            Comment.objects.create(post=post, author=self.user,
+                                   text=f'Комментарий {i}')
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id}))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 3)
+        self.assertContains(response, 'data-more-comments')
+        response = self.guest_client.get(
+            reverse('posts:comments', kwargs={'post_id': post.id})
+            + f'?after={comments.next_cursor}')
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        rest = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in list(comments) + list(rest)],
+            [f'Комментарий {i}' for i in range(4, -1, -1)]
+        )
+        self.assertNotContains(response, 'data-more-comments')
+
 
 class FollowViewsTest(TestCase):
 
@@ -280,3 +419,257 @@ class FollowViewsTest(TestCase):
         response = self.follower_client.get(
             reverse('posts:follow_index'))
         self.assertNotIn(post, response.context['page_obj'])
+
+    def test_followers_lenta_cursor(self):
+        """Курсорная пагинация ленты подписок не дублирует посты."""
+        Follow.objects.create(
+            user=self.follower_1,
+            author=self.author_1)
+        Follow.objects.create(
+            user=self.author_1,
+            author=self.author_1)
+        response = self.follower_client.get(
+            reverse('posts:follow_index') + '?after=')
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+    def test_unfollow_removes_posts_from_lenta(self):
+        """После отписки посты автора пропадают из ленты."""
+        Follow.objects.create(
+            user=self.follower_1,
+            author=self.author_1)
+        self.follower_client.post(
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': self.author_1}))
+        response = self.follower_client.get(
+            reverse('posts:follow_index'))
+        self.assertNotIn(self.post, response.context['page_obj'])
+
+    @override_settings(FEED_MAX_LENGTH=2)
+    def test_lenta_length_is_capped(self):
+        """Лента подписчика не превышает FEED_MAX_LENGTH записей."""
+        Follow.objects.create(
+            user=self.follower_1,
+            author=self.author_1)
+        posts = [
+            Post.objects.create(author=self.author_1, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        entries = FeedEntry.objects.filter(user=self.follower_1)
+        self.assertEqual(entries.count(), 2)
+        self.assertEqual(
+            set(entries.values_list('post_id', flat=True)),
+            {posts[1].id, posts[2].id}
+        )
+
+    def test_rebuild_feeds_command(self):
+        """Команда rebuild_feeds восстанавливает ленту по подпискам."""
+        Follow.objects.create(
+            user=self.follower_1,
+            author=self.author_1)
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feeds', self.follower_1.username,
+                     stdout=StringIO())
+        response = self.follower_client.get(
+            reverse('posts:follow_index'))
+        self.assertIn(self.post, response.context['page_obj'])
+
+
+class SearchViewsTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Searcher')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Про котиков и собак')
+        Post.objects.create(author=cls.user, text='Только собаки')
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_search_finds_posts(self):
+        """Поиск находит посты по началу слова."""
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'котик'})
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+    def test_search_follows_edits_and_deletes(self):
+        """Индекс поиска обновляется при изменении и удалении поста."""
+        self.post.text = 'Про хомяков'
+        self.post.save()
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'хомяков'})
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+        self.post.delete()
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'хомяков'})
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    @override_settings(PAGE=1)
+    def test_search_pagination_keeps_query(self):
+        """Ссылки пагинатора сохраняют поисковый запрос."""
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'собак'})
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+        self.assertContains(response, '?q=%D1%81%D0%BE%D0%B1%D0%B0%D0%BA'
+                                      '&amp;page=2')
+
+
+class ConditionalGetTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый текст')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def assertNotModified(self, client, url):
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Cookie', response['Vary'])
+        repeated = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeated.status_code, 304)
+        return response['ETag']
+
+    def test_unchanged_pages_not_modified(self):
+        """Повторный запрос без изменений получает 304."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertNotModified(self.guest_client, url)
+        self.assertNotModified(self.authorized_client,
+                               reverse('posts:follow_index'))
+
+    def test_not_modified_without_rendering(self):
+        """Для 304 главной гостю не нужен ни один SQL-запрос."""
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=self.guest_client.get(
+                url)['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_etag(self):
+        """Новые посты, комментарии и подписки меняют ETag."""
+        cases = (
+            (reverse('posts:index'), self.guest_client,
+             lambda: Post.objects.create(author=self.author, text='Новый')),
+            (reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+             self.guest_client,
+             lambda: Comment.objects.create(
+                 post=self.post, author=self.reader, text='Комментарий')),
+            (reverse('posts:profile', kwargs={'username': 'author'}),
+             self.authorized_client,
+             lambda: Follow.objects.create(
+                 user=self.reader, author=self.author)),
+            (reverse('posts:follow_index'), self.authorized_client,
+             lambda: Post.objects.create(author=self.author, text='Ещё')),
+        )
+        for url, client, change in cases:
+            with self.subTest(url=url):
+                etag = self.assertNotModified(client, url)
+                change()
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_thumbnail_invalidates_feeds(self):
+        """Готовая миниатюра меняет ETag лент, где выводится пост."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+        ]
+        etags = {url: self.assertNotModified(self.guest_client, url)
+                 for url in urls}
+        with mock.patch.object(thumbnails, 'source_exists',
+                               return_value=True), \
+                mock.patch.object(thumbnails, 'default'):
+            self.assertTrue(thumbnails.generate(self.post.id, 'posts/a.jpg'))
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_moving_post_invalidates_old_group(self):
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        etag = self.assertNotModified(self.guest_client, url)
+        post = Post.objects.get(id=self.post.id)
+        post.group = self.other_group
+        post.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        url = reverse('posts:index')
+        guest_etag = self.guest_client.get(url)['ETag']
+        response = self.authorized_client.get(
+            url, HTTP_IF_NONE_MATCH=guest_etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class StreamingFeedTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f'Пост {i}')
+            for i in range(3)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+        self.urls = (
+            (self.guest_client, reverse('posts:index')),
+            (self.guest_client,
+             reverse('posts:group_list', kwargs={'slug': 'group'})),
+            (self.guest_client,
+             reverse('posts:profile', kwargs={'username': 'author'})),
+            (self.authorized_client, reverse('posts:follow_index')),
+        )
+
+    def test_streamed_page_matches_rendered(self):
+        """Потоковая страница совпадает с обычной."""
+        for client, url in self.urls:
+            with self.subTest(url=url):
+                expected = client.get(url).content
+                cache.clear()
+                with self.settings(STREAMING_FEEDS=True):
+                    response = client.get(url)
+                self.assertTrue(response.streaming)
+                self.assertEqual(b''.join(response.streaming_content),
+                                 expected)
+
+    def test_shell_sent_before_posts(self):
+        """Первый кусок — оболочка без постов, посты идут по одному."""
+        with self.settings(STREAMING_FEEDS=True):
+            response = self.guest_client.get(reverse('posts:index'))
+            chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertIn('<head>', chunks[0])
+        self.assertNotIn('Пост', chunks[0])
+        self.assertEqual(
+            len([chunk for chunk in chunks if 'Пост' in chunk]), 3)
@@ -0,0 +1,91 @@
+"""Предварительная генерация миниатюр изображений постов.
+
+Миниатюры создаются задачей в очереди core.jobs после сохранения поста,
+а шаблоны только ищут готовую миниатюру в хранилище ключей sorl-thumbnail
+и, пока её нет, выводят оригинал, не декодируя изображение внутри запроса.
+Повторные сохранения поста с тем же изображением не ставят новую задачу,
+пока прежняя ждёт в очереди.
+"""
+import logging
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from sorl.thumbnail import base, default
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from core import instrumentation, jobs
+
+from . import feed
+
+logger = logging.getLogger(__name__)
+
+GEOMETRY = '960x339'
+OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+class ThumbnailBackend(base.ThumbnailBackend):
+    """Бэкенд sorl-thumbnail с поиском миниатюры без её генерации."""
+
+    def get_cached_thumbnail(self, file_, geometry_string, **options):
+        """Возвращает готовую миниатюру или None.
+
+        Параметры дополняются так же, как в get_thumbnail, чтобы имя
+        миниатюры совпадало с созданной при генерации.
+        """
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def cached(image):
+    """Готовая миниатюра изображения поста или None."""
+    if not image:
+        return None
+    with instrumentation.thumbnail_timer():
+        return default.backend.get_cached_thumbnail(
+            image, GEOMETRY, **OPTIONS
+        )
+
+
+def source_exists(name: str) -> bool:
+    """Есть ли файл изображения в хранилище медиафайлов."""
+    try:
+        return default_storage.exists(name)
+    except SuspiciousFileOperation:
+        return False
+
+
+@jobs.task
+def generate(post_id: int, name: str) -> bool:
+    """Создаёт миниатюру и сбрасывает кэшированную карточку поста."""
+    if not source_exists(name):
+        return False
+    try:
+        with instrumentation.thumbnail_timer():
+            default.backend.get_thumbnail(name, GEOMETRY, **OPTIONS)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', name)
+        return False
+    # Карточка меняется, а валидаторы лент строятся по версиям лент.
+    feed.bump_post_id(post_id)
+    return True
+
+
+def schedule(post) -> None:
+    """Ставит генерацию миниатюры поста в очередь фоновых задач."""
+    if not post.image:
+        return
+    jobs.enqueue(
+        generate, dedupe_key=f'post-thumbnail:{post.pk}:{post.image.name}',
+        post_id=post.pk, name=post.image.name,
+    )
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.paginator import Page
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import render
+
+from core import streaming
+
+from . import caching
+from .paginators import (
+    CursorPage, CursorPaginator, FeedPaginator, decode_cursor
+)
+
+
+def get_page(request: HttpRequest, queryset, cursor: bool = True,
+             count_key: str = None, **cursor_options) -> Page:
+    """Возвращает страницу ленты по параметрам запроса.
+
+    Курсорная пагинация включается параметрами ?after=/?before=
+    (пустой ?after= — первая страница) или настройкой CURSOR_PAGINATION,
+    иначе используется постраничный FeedPaginator с числом постов из
+    кэша по ключу версии ленты count_key. Для выборок без порядка по дате
+    (cursor=False) всегда используется FeedPaginator.
+    """
+    params = request.GET
+    if cursor and ('after' in params or 'before' in params
+                   or settings.CURSOR_PAGINATION):
+        paginator = CursorPaginator(queryset, settings.PAGE,
+                                    **cursor_options)
+        return paginator.get_cursor_page(
+            after=decode_cursor(params.get('after', '')),
+            before=decode_cursor(params.get('before', '')),
+        )
+    paginator = FeedPaginator(queryset, settings.PAGE, count_key=count_key)
+    return paginator.get_page(params.get('page'))
+
+
+def get_comments_page(request: HttpRequest, post) -> CursorPage:
+    """Возвращает страницу комментариев поста после курсора ?after=."""
+    comments = post.comments.select_related('author').only(
+        'id', 'text', 'created', 'post', 'author__id', 'author__username'
+    )
+    paginator = CursorPaginator(comments, settings.COMMENTS_PAGE,
+                                keys=('created', 'id'))
+    return paginator.get_cursor_page(
+        after=decode_cursor(request.GET.get('after', ''))
+    )
+
+
+def render_feed(request: HttpRequest, template: str, context: dict,
+                posts, **options) -> HttpResponse:
+    """Рендерит ленту постов с page_obj в контексте.
+
+    При STREAMING_FEEDS = True страница отдаётся потоком: оболочка
+    уходит клиенту до запросов за постами, см. core.streaming.
+    """
+    def get_page_obj():
+        page_obj = get_page(request, posts, **options)
+        caching.attach_card_versions(page_obj)
+        return page_obj
+
+    if settings.STREAMING_FEEDS:
+        return streaming.render_stream(request, template, context,
+                                       page_obj=get_page_obj)
+    context['page_obj'] = get_page_obj()
+    return render(request, template, context)
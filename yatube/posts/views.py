@@ -1,62 +1,57 @@
 from datetime import datetime
 
-from django.core.paginator import Paginator
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.http import HttpRequest, HttpResponse
-from django.conf import settings
-from django.views.decorators.cache import cache_page
 
+from . import caching, conditional, counters, feed, search
 from .models import Post, Group, User, Follow
 from .forms import PostForm, CommentForm
+from .utils import get_comments_page, get_page, render_feed
 
 
-@cache_page(20)
+@conditional.page(conditional.index_keys)
 def index(request: HttpRequest) -> HttpResponse:
     """Функция для главной страницы.
     """
     template = 'posts/index.html'
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, settings.PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.feed()
     title = 'Последние обновления на сайте'
     context = {
-        'page_obj': page_obj,
         'title': title,
     }
-    return render(request, template, context)
+    return render_feed(request, template, context, post_list,
+                       count_key=caching.feed_key('index'))
 
 
+@conditional.page(conditional.group_keys)
 def group_posts(request: HttpRequest, slug: str) -> HttpResponse:
     """Функция для записей сообщества.
     """
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts = Post.objects.filter(group=group)
-    paginator = Paginator(posts, settings.PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = group.posts.feed()
     title = f'Записи сообщества {group}'
     context = {
         'group': group,
         'posts': posts,
-        'page_obj': page_obj,
         'title': title,
     }
-    return render(request, template, context)
+    return render_feed(request, template, context, posts,
+                       count_key=caching.feed_key('group', group.pk))
 
 
+@conditional.page(conditional.profile_keys)
 def profile(request: HttpRequest, username: str) -> HttpResponse:
     """Функция для профайла пользователя.
     """
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    count_posts = author.posts.count()
-    paginator = Paginator(posts, settings.PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = author.posts.feed()
+    stats = counters.for_user(author)
     following = request.user.is_authenticated
     if following:
         following = author.following.filter(user=request.user).exists()
@@ -64,23 +59,41 @@ def profile(request: HttpRequest, username: str) -> HttpResponse:
     context = {
         'author': author,
         'posts': posts,
-        'count_posts': count_posts,
-        'page_obj': page_obj,
+        'count_posts': stats.posts_count,
+        'stats': stats,
         'title': title,
         'following': following
     }
+    return render_feed(request, template, context, posts,
+                       count_key=caching.feed_key('author', author.pk))
+
+
+def post_search(request: HttpRequest) -> HttpResponse:
+    """Функция для поиска по тексту постов.
+    """
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    page_obj = get_page(request, search.search(query), cursor=False)
+    caching.attach_card_versions(page_obj)
+    title = f'Поиск: {query}' if query else 'Поиск'
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'title': title,
+    }
     return render(request, template, context)
 
 
+@conditional.page(conditional.detail_keys)
 def post_detail(request: HttpRequest, post_id: int) -> HttpResponse:
     """Функция для просмотра записи.
     """
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post.objects.detail(), id=post_id)
     group = post.group
     author = post.author
-    count_posts = author.posts.count()
-    comments = post.comments.all()
+    count_posts = counters.for_user(author).posts_count
+    comments = get_comments_page(request, post)
     form = CommentForm()
     title = f'Пост {post.text[:30]}'
     context = {
@@ -94,6 +107,18 @@ def post_detail(request: HttpRequest, post_id: int) -> HttpResponse:
     return render(request, template, context)
 
 
+def post_comments(request: HttpRequest, post_id: int) -> HttpResponse:
+    """Функция для подгрузки следующей страницы комментариев.
+    """
+    template = 'posts/includes/comment_list.html'
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    context = {
+        'post': post,
+        'comments': get_comments_page(request, post),
+    }
+    return render(request, template, context)
+
+
 @login_required
 def post_create(request: HttpRequest) -> HttpResponse:
     """Функция для публикации постов.
@@ -120,7 +145,9 @@ def post_create(request: HttpRequest) -> HttpResponse:
     post = form.save(commit=False)
     post.author = request.user
     post.pub_date = datetime.now()
-    post.save()
+    # Пост и задачи, которые ставят его сигналы, фиксируются вместе.
+    with transaction.atomic():
+        post.save()
     return redirect('posts:profile', request.user)
 
 
@@ -129,7 +156,9 @@ def post_edit(request: HttpRequest, post_id: int) -> HttpResponse:
     """Функция для редактирования постов.
     """
     template = 'posts/update_post.html'
-    post = get_object_or_404(Post, id=post_id, author=request.user)
+    post = get_object_or_404(
+        Post.objects.detail(), id=post_id, author=request.user
+    )
     title = f'Редактрирование поста {post.id}'
     form = PostForm(instance=post)
     if request.method != 'POST':
@@ -155,14 +184,16 @@ def post_edit(request: HttpRequest, post_id: int) -> HttpResponse:
     post = form.save(commit=False)
     post.author = request.user
     post.pub_date = datetime.now()
-    post.save()
+    # Пост и задачи, которые ставят его сигналы, фиксируются вместе.
+    with transaction.atomic():
+        post.save()
     return redirect('posts:post_detail', post.id)
 
 
 @login_required
 def add_comment(request: HttpRequest,
                 post_id: int) -> HttpResponse:
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
     if request.method != 'POST':
         form = CommentForm()
         context = {
@@ -183,23 +214,21 @@ def add_comment(request: HttpRequest,
 
 
 @login_required
+@conditional.page(conditional.follow_keys)
 def follow_index(request):
     title = 'Подписки'
-    posts = Post.objects.filter(
-        author__following__user=request.user)
+    posts = feed.posts_for(request.user)
     if request.method != 'GET':
         context = {
             'title': title,
         }
         return render(request, context)
-    paginator = Paginator(posts, settings.PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
     context = {
-        'page_obj': page_obj,
         'title': title,
     }
-    return render(request, 'posts/follow.html', context)
+    return render_feed(request, 'posts/follow.html', context, posts,
+                       count_key=caching.feed_key('follow', request.user.pk),
+                       lookups=('feed_date', 'feed_post'))
 
 
 @login_required
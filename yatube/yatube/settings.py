@@ -46,12 +46,17 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StaticFilesMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.ReplicaPinningMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -62,12 +67,19 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# Загрузчики убирают отступы из HTML-шаблонов, см. core.loaders.
+TEMPLATE_LOADERS = [
+    'core.loaders.FilesystemLoader',
+    'core.loaders.AppDirectoriesLoader',
+]
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS if DEBUG else [
+                ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -89,9 +101,37 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение переживает запрос: PRAGMA и открытие файла
+        # выполняются раз в минуту на поток, а не на каждый запрос.
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# PRAGMA для каждого соединения SQLite, см. core.sqlite.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+SQLITE_LOCK_RETRIES = 5
+SQLITE_LOCK_BACKOFF = 0.05
+
+# Реплики только для чтения, см. core.replicas. Пример для копии SQLite,
+# обновляемой командой refresh_replica:
+#
+# DATABASES['replica'] = {
+#     'ENGINE': 'django.db.backends.sqlite3',
+#     'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+#     'TEST': {'MIRROR': 'default'},
+# }
+# DATABASE_REPLICAS = ['replica']
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+REPLICA_PIN_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -134,6 +174,10 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+# Сколько кэшировать статику без хеша в имени, секунды.
+STATIC_MAX_AGE = 60
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -143,13 +187,76 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 PAGE = 10
 
+COMMENTS_PAGE = 20
+
+CURSOR_PAGINATION = False
+
+# Сколько номеров страниц показывать по обе стороны от текущей.
+PAGINATOR_WINDOW = 3
+
+# В ленте больше постов — после её изменения число постов какое-то время
+# берётся из кэша без пересчёта, см. posts.paginators.FeedPaginator.
+PAGINATOR_EXACT_COUNT = 10000
+PAGINATOR_ESTIMATE_TIMEOUT = 60 * 10
+
+FEED_MAX_LENGTH = 500
+
+# Больше подписчиков — пост раскладывается по лентам фоновой задачей.
+# Синхронная раскладка — два запроса при любом числе подписчиков, но
+# обрезка лент просматривает до FEED_MAX_LENGTH записей каждого из них
+# (около 0,6 мс на полную ленту в SQLite), так что на 50 подписчиков
+# публикация поста ждёт не больше ~30 мс.
+FEED_FANOUT_SYNC_LIMIT = 50
+
+# Отдавать ленты потоком: оболочка страницы уходит до запросов за
+# постами, см. core.streaming.
+STREAMING_FEEDS = False
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Каталоги MEDIA_ROOT, которые отдаются всем: картинки постов и миниатюры.
+MEDIA_PUBLIC_PREFIXES = ('posts/', 'cache/')
+# Каталоги, где имена файлов не переиспользуются: обработанные картинки
+# (posts.images) и миниатюры. Они кэшируются браузером навсегда, прочие
+# файлы — на MEDIA_MAX_AGE секунд с проверкой по ETag.
+MEDIA_IMMUTABLE_PREFIXES = ('posts/normalized/', 'cache/')
+MEDIA_MAX_AGE = 60 * 60
+# None — файлы отдаёт Django; 'x-accel-redirect' — nginx с internal
+# location MEDIA_ACCEL_PREFIX, 'x-sendfile' — Apache или lighttpd.
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+THUMBNAIL_BACKEND = 'posts.thumbnails.ThumbnailBackend'
+
+POST_IMAGE_MAX_SIZE = (1920, 1920)
+POST_IMAGE_QUALITY = 82
+
+# Очередь фоновых задач core.jobs, выполняется командой runworker.
+JOBS_EAGER = False
+JOBS_WORKERS = 4
+JOBS_MAX_ATTEMPTS = 5
+JOBS_BACKOFF = 10
+JOBS_BACKOFF_MAX = 60 * 60
+JOBS_LOCK_TIMEOUT = 10 * 60
+
+# Адреса, которым /metrics/ доступен без входа. Сверяются с REMOTE_ADDR:
+# за обратным прокси на той же машине все запросы приходят с 127.0.0.1,
+# поэтому по умолчанию список пуст и метрики видят только сотрудники.
+METRICS_ALLOWED_IPS = []
+
+# Каталог, где рабочие процессы сохраняют свои показатели, чтобы /metrics/
+# отдавал их сумму, см. core.metrics. Очищается при перезапуске сервиса.
+METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+METRICS_FLUSH_INTERVAL = 5
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_BYTES': 64 * 1024 * 1024,
+        },
     }
 }
@@ -0,0 +1,16 @@
+"""Настройки для тестов.
+
+Тесты не должны видеть кэш и метрики работающего сайта и прошлых
+прогонов, поэтому кэш и метрики хранятся в памяти процесса. Запуск::
+
+    python manage.py test --settings=yatube.test_settings
+"""
+from .settings import *  # noqa: F401,F403
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+METRICS_DIR = None